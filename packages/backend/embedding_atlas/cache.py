@@ -38,16 +38,19 @@ import logging
 import secrets
 import struct
 from functools import lru_cache
-from io import BytesIO, TextIOWrapper
+from io import BytesIO
 from pathlib import Path
 from typing import IO, Any, Callable
 
 import numpy as np
+import pyarrow as pa
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from platformdirs import user_cache_path
 
+from .utils import json_dumps, json_loads
+
 logger = logging.getLogger("embedding-atlas")
 
 
@@ -429,10 +432,35 @@ def _update_hash_with_value(update_func: Callable[[bytes], None], *value: Any):
                 + b"\x00"
                 + struct.pack(f"<I{len(v.shape)}Q", len(v.shape), *v.shape)
             )
-            data_bytes = v.tobytes()
-            preamble(b"np.ndarray", len(prefix_bytes) + len(data_bytes))
+            data = np.ascontiguousarray(v)
+            preamble(b"np.ndarray", len(prefix_bytes) + data.nbytes)
             update_func(prefix_bytes)
-            update_func(data_bytes)
+            if data.dtype.hasobject:
+                update_func(data.tobytes())
+            else:
+                # Hash the array memory in place rather than through a bytes copy.
+                update_func(data.reshape(-1).view(np.uint8))  # type: ignore
+        elif isinstance(v, pa.Array) and _is_large_binary_like(v.type):
+            if v.null_count > 0:
+                emit_value(v.to_pylist())
+                return
+            # Hash the offsets and data buffers directly instead of visiting
+            # each element; offsets are rebased so slices hash like copies.
+            kind = (
+                b"pa.large_string"
+                if pa.types.is_large_string(v.type)
+                else b"pa.large_binary"
+            )
+            _, offsets_buffer, data_buffer = v.buffers()
+            offsets = np.frombuffer(offsets_buffer, dtype=np.int64)[
+                v.offset : v.offset + len(v) + 1
+            ]
+            start, end = int(offsets[0]), int(offsets[-1])
+            offsets_bytes = (offsets - start).tobytes()
+            preamble(kind, len(offsets_bytes) + (end - start))
+            update_func(offsets_bytes)
+            if data_buffer is not None:
+                update_func(memoryview(data_buffer)[start:end])
         elif isinstance(v, list):
             preamble(b"list", len(v))
             for item in v:
@@ -449,6 +477,10 @@ def _update_hash_with_value(update_func: Callable[[bytes], None], *value: Any):
         emit_value(item)
 
 
+def _is_large_binary_like(type: pa.DataType) -> bool:
+    return pa.types.is_large_string(type) or pa.types.is_large_binary(type)
+
+
 def sha256_hexdigest(value: Any, scope: str | None = None):
     h = hashlib.sha256()
     _update_hash_with_value(h.update, scope, value)
@@ -456,13 +488,8 @@ def sha256_hexdigest(value: Any, scope: str | None = None):
 
 
 def default_serializer(value: Any, fd: IO[bytes]) -> None:
-    text_fd = TextIOWrapper(fd, encoding="utf-8")
-    json.dump(value, text_fd)
-    text_fd.detach()
+    fd.write(json_dumps(value))
 
 
 def default_deserializer(fd: IO[bytes]) -> Any:
-    text_fd = TextIOWrapper(fd, encoding="utf-8")
-    result = json.load(text_fd)
-    text_fd.detach()
-    return result
+    return json_loads(fd.read())
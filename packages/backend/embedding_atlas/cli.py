@@ -598,8 +598,8 @@ def main(
 
     if export_application is not None:
         if export_application.endswith(".zip"):
-            with open(export_application, "wb") as f:
-                f.write(dataset.make_archive(static, export_metadata))
+            with open(export_application, "w+b", buffering=1024 * 1024) as f:
+                dataset.write_archive(f, static, export_metadata)
         else:
             dataset.export_to_folder(static, export_application, export_metadata)
         return
@@ -1,27 +1,54 @@
 # Copyright (c) 2025 Apple Inc. Licensed under MIT License.
 
-import json
+import contextlib
 import os
 import pathlib
 import re
+import secrets
 import shutil
+import tempfile
+import threading
+import time
 import zipfile
-from io import BytesIO
-from typing import Any
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO, UnsupportedOperation
+from typing import IO, Any
 
 import pandas as pd
+from platformdirs import user_cache_path
 
-from .cache import file_cache_get, file_cache_set
-from .utils import to_parquet_bytes
+from .cache import file_cache_get, file_cache_set, sha256_hexdigest
+from .utils import json_dumps, write_parquet
+
+# Buffer size for copying bundles and writing archives; large enough that the
+# number of read/write syscalls stays small for multi-megabyte members.
+_COPY_BUFSIZE = 1024 * 1024
+
+# Number of static bundles kept in the user cache directory.
+_STATIC_BUNDLE_KEEP = 4
+
+# Age in seconds after which a temporary bundle file is considered abandoned.
+_STATIC_BUNDLE_TMP_MAX_AGE = 60 * 60
+
+# Number of distinct metadata overrides whose serialized metadata is kept.
+_METADATA_JSON_CACHE_SIZE = 8
 
 
 def _deep_merge(base: dict, overrides: dict) -> dict:
     result = base.copy()
-    for key, value in overrides.items():
-        if key in result and isinstance(result[key], dict) and isinstance(value, dict):
-            result[key] = _deep_merge(result[key], value)
-        else:
-            result[key] = value
+    # Walk the overrides with an explicit stack, copying only the nested dicts
+    # that are actually being merged into (base is never mutated).
+    stack = [(result, overrides)]
+    while stack:
+        target, source = stack.pop()
+        for key, value in source.items():
+            current = target.get(key)
+            if isinstance(current, dict) and isinstance(value, dict):
+                target[key] = current.copy()
+                stack.append((target[key], value))
+            else:
+                target[key] = value
     return result
 
 
@@ -52,6 +79,12 @@ class DataSource:
         self.metadata = metadata
         self.additional_tables = additional_tables or {}
         self._cache_index: set[str] = set(self._cache_index_load())
+        self._metadata_json: OrderedDict[str, tuple[dict, dict, bytes]] = OrderedDict()
+        self._metadata_json_lock = threading.Lock()
+        self._parquet_lock = threading.Lock()
+        self._parquet_directory: tempfile.TemporaryDirectory | None = None
+        self._parquet_path: str | None = None
+        self._parquet_source: pd.DataFrame | None = None
 
     def _cache_index_key(self):
         return [self.identifier, "__index__"]
@@ -109,29 +142,116 @@ class DataSource:
             metadata = _deep_merge(metadata, metadata_overrides)
         return metadata
 
-    def make_archive(
+    def _build_metadata_json(self, metadata_overrides: dict | None = None) -> bytes:
+        """Return the serialized metadata, memoized by the overrides.
+
+        The most recently used overrides are kept. Like ``dataset_parquet_path``,
+        entries are rebuilt when ``self.metadata`` or ``self.additional_tables``
+        is replaced (not when mutated in place).
+        """
+        key = json_dumps(metadata_overrides, sort_keys=True).decode("utf-8")
+        with self._metadata_json_lock:
+            entry = self._metadata_json.get(key)
+            if (
+                entry is None
+                or entry[0] is not self.metadata
+                or entry[1] is not self.additional_tables
+            ):
+                result = json_dumps(self._build_metadata(metadata_overrides))
+                entry = (self.metadata, self.additional_tables, result)
+                self._metadata_json[key] = entry
+            self._metadata_json.move_to_end(key)
+            while len(self._metadata_json) > _METADATA_JSON_CACHE_SIZE:
+                self._metadata_json.popitem(last=False)
+        return entry[2]
+
+    def dataset_parquet_path(self) -> str:
+        """Return the path of a parquet file holding the dataset.
+
+        The file is written to a temporary directory owned by this data source,
+        and only re-encoded when ``self.dataset`` is replaced, so archives,
+        exports and the server can all copy it instead of encoding it again.
+        """
+        with self._parquet_lock:
+            if self._parquet_source is not self.dataset:
+                if self._parquet_directory is None:
+                    self._parquet_directory = tempfile.TemporaryDirectory(
+                        prefix="embedding-atlas-"
+                    )
+                fd, path = tempfile.mkstemp(
+                    suffix=".parquet", dir=self._parquet_directory.name
+                )
+                os.close(fd)
+                write_parquet(self.dataset, path)
+                if self._parquet_path is not None:
+                    # May still be open elsewhere (which blocks this on Windows);
+                    # the directory is removed with the data source in any case.
+                    with contextlib.suppress(OSError):
+                        os.unlink(self._parquet_path)
+                self._parquet_path = path
+                self._parquet_source = self.dataset
+            return self._parquet_path
+
+    def _iter_cache_files(self):
+        """Yield (name, serialized bytes) for every cached entry."""
+        for name, value in self.cache_items().items():
+            yield name, json_dumps(value)
+
+    def write_archive(
         self,
+        out: IO[bytes],
         static_path: str,
         metadata_overrides: dict | None = None,
+        compresslevel: int = 1,
     ):
-        io = BytesIO()
-        with zipfile.ZipFile(io, "w", zipfile.ZIP_DEFLATED) as zip:
+        """Write the static application archive (zip) to a binary file.
+
+        The archive is written sequentially, so ``out`` need not be seekable (e.g.
+        a pipe). The members of the prebuilt static bundle are copied in with
+        their compressed data as-is.
+
+        Parquet members are stored uncompressed since their pages are already
+        compressed; the remaining members are deflated with ``compresslevel``.
+        """
+        writer = _ArchiveWriter(out)
+        with (
+            _open_static_bundle(static_path, compresslevel) as bundle_file,
+            zipfile.ZipFile(bundle_file) as bundle,
+        ):
+            # The bundle's local headers and data come first, up to its central
+            # directory, so its members keep their offsets in the archive.
+            bundle_infos = bundle.infolist()
+            bundle_file.seek(0)
+            _copy_bytes(bundle_file, writer, bundle.start_dir)
+        with zipfile.ZipFile(
+            writer, "w", zipfile.ZIP_DEFLATED, compresslevel=compresslevel
+        ) as zip:
+            # List the copied members in the archive's central directory.
+            for info in bundle_infos:
+                zip.filelist.append(info)
+                zip.NameToInfo[info.filename] = info
             zip.writestr(
-                "data/metadata.json",
-                json.dumps(self._build_metadata(metadata_overrides)),
+                "data/metadata.json", self._build_metadata_json(metadata_overrides)
             )
-            zip.writestr("data/dataset.parquet", to_parquet_bytes(self.dataset))
+            with (
+                _zip_open_stored(zip, "data/dataset.parquet") as f,
+                open(self.dataset_parquet_path(), "rb") as parquet,
+            ):
+                shutil.copyfileobj(parquet, f, _COPY_BUFSIZE)
             for name, df in self.additional_tables.items():
-                zip.writestr(f"data/tables/{name}.parquet", to_parquet_bytes(df))
-            for root, _, files in os.walk(static_path):
-                for fn in files:
-                    p = os.path.relpath(os.path.join(root, fn), static_path)
-                    zip.write(os.path.join(root, fn), p)
-            for name, value in self.cache_items().items():
-                zip.writestr(
-                    f"data/cache/{name}",
-                    json.dumps(value),
-                )
+                with _zip_open_stored(zip, f"data/tables/{name}.parquet") as f:
+                    write_parquet(df, f)
+            for name, data in self._iter_cache_files():
+                zip.writestr(f"data/cache/{name}", data)
+
+    def make_archive(
+        self,
+        static_path: str,
+        metadata_overrides: dict | None = None,
+        compresslevel: int = 1,
+    ) -> bytes:
+        io = BytesIO()
+        self.write_archive(io, static_path, metadata_overrides, compresslevel)
         return io.getvalue()
 
     def export_to_folder(
@@ -146,28 +266,153 @@ class DataSource:
         # Write metadata and parquet data
         data_dir = folder / "data"
         data_dir.mkdir(exist_ok=True)
-        (data_dir / "metadata.json").write_text(
-            json.dumps(self._build_metadata(metadata_overrides))
+        (data_dir / "metadata.json").write_bytes(
+            self._build_metadata_json(metadata_overrides)
         )
-        (data_dir / "dataset.parquet").write_bytes(to_parquet_bytes(self.dataset))
+        shutil.copyfile(self.dataset_parquet_path(), data_dir / "dataset.parquet")
         if self.additional_tables:
             tables_dir = data_dir / "tables"
             tables_dir.mkdir(exist_ok=True)
             for name, df in self.additional_tables.items():
-                (tables_dir / f"{name}.parquet").write_bytes(to_parquet_bytes(df))
-
-        # Copy static frontend files
-        for root, _, files in os.walk(static_path):
-            for fn in files:
-                src = os.path.join(root, fn)
-                rel = os.path.relpath(src, static_path)
-                dst = folder / rel
-                dst.parent.mkdir(parents=True, exist_ok=True)
-                shutil.copy2(src, dst)
-
-        # Write cache files
+                write_parquet(df, tables_dir / f"{name}.parquet")
+
+        # Copy static frontend files and write cache files. Both are dominated by
+        # per-file syscalls, so run them on a thread pool after creating all the
+        # destination directories up front.
+        copies = [(src, folder / rel) for src, rel in _iter_static_files(static_path)]
         cache_dir = data_dir / "cache"
-        for name, value in self.cache_items().items():
-            cache_file = cache_dir / name
-            cache_file.parent.mkdir(parents=True, exist_ok=True)
-            cache_file.write_text(json.dumps(value))
+        writes = [(cache_dir / name, data) for name, data in self._iter_cache_files()]
+
+        parents = {dst.parent for _, dst in copies} | {dst.parent for dst, _ in writes}
+        for parent in sorted(parents):
+            parent.mkdir(parents=True, exist_ok=True)
+
+        max_workers = min(32, (os.cpu_count() or 1) * 4)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(shutil.copyfile, src, dst) for src, dst in copies
+            ]
+            futures += [executor.submit(dst.write_bytes, data) for dst, data in writes]
+            for future in futures:
+                future.result()
+
+
+def _iter_static_files(static_path: str):
+    """Yield (absolute path, relative path) for every file under static_path."""
+    for root, _, files in os.walk(static_path):
+        for fn in files:
+            src = os.path.join(root, fn)
+            yield src, os.path.relpath(src, static_path)
+
+
+class _ArchiveWriter:
+    """Forward writes to a binary file, counting the bytes written.
+
+    ``ZipFile`` records member offsets from ``tell()``, which counts from the
+    start of the archive. Seeking is not supported, so ``ZipFile`` streams each
+    member followed by a data descriptor.
+    """
+
+    def __init__(self, out: IO[bytes]):
+        self.out = out
+        self.position = 0
+
+    def write(self, data) -> int:
+        self.out.write(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, *args):
+        raise UnsupportedOperation("seek")
+
+    def flush(self):
+        self.out.flush()
+
+
+def _copy_bytes(src: IO[bytes], dst, length: int):
+    while length > 0:
+        data = src.read(min(length, _COPY_BUFSIZE))
+        if not data:
+            raise EOFError("unexpected end of file")
+        dst.write(data)
+        length -= len(data)
+
+
+def _open_static_bundle(static_path: str, compresslevel: int) -> IO[bytes]:
+    try:
+        return open(_static_bundle(static_path, compresslevel), "rb")
+    except FileNotFoundError:
+        # Another process pruned the bundle after it was found; build it again.
+        return open(_static_bundle(static_path, compresslevel), "rb")
+
+
+def _static_bundle(static_path: str, compresslevel: int) -> pathlib.Path:
+    """Return a zip of the static frontend files, built once per distinct tree.
+
+    The bundle is content-addressed by the relative path, size and modification
+    time of every file, so archives only compress the frontend again when the
+    static files change.
+    """
+    manifest = []
+    for src, rel in _iter_static_files(static_path):
+        stat = os.stat(src)
+        manifest.append([rel, stat.st_size, stat.st_mtime_ns])
+    manifest.sort()
+    key = sha256_hexdigest([manifest, compresslevel], scope="StaticBundle")
+
+    bundle_root = user_cache_path("embedding_atlas") / "static_bundles"
+    bundle_path = bundle_root / f"{key}.zip"
+    try:
+        # Refresh the modification time so pruning keeps recently used bundles;
+        # this also checks that the bundle exists.
+        os.utime(bundle_path)
+        return bundle_path
+    except FileNotFoundError:
+        pass
+    except OSError:
+        return bundle_path
+
+    bundle_root.mkdir(parents=True, exist_ok=True)
+    bundle_path_tmp = bundle_root / f"{key}.zip.tmp-{secrets.token_hex(8)}"
+    with (
+        open(bundle_path_tmp, "wb", buffering=_COPY_BUFSIZE) as f,
+        zipfile.ZipFile(
+            f, "w", zipfile.ZIP_DEFLATED, compresslevel=compresslevel
+        ) as zip,
+    ):
+        for src, rel in _iter_static_files(static_path):
+            zip.write(src, rel)
+    bundle_path_tmp.replace(bundle_path)
+
+    # Each upgrade or rebuild of the frontend leaves a new bundle behind, so keep
+    # only the most recently used ones, and remove the temporary files of builds
+    # that were interrupted. Another process may be pruning too.
+    def mtime_ns(path: pathlib.Path) -> float:
+        # Files removed meanwhile sort as the newest, so they are left alone.
+        try:
+            return path.stat().st_mtime_ns
+        except OSError:
+            return float("inf")
+
+    bundles = sorted(bundle_root.glob("*.zip"), key=mtime_ns, reverse=True)
+    stale = bundles[_STATIC_BUNDLE_KEEP:] + [
+        tmp
+        for tmp in bundle_root.glob("*.zip.tmp-*")
+        if time.time_ns() - mtime_ns(tmp) > _STATIC_BUNDLE_TMP_MAX_AGE * 10**9
+    ]
+    for path in stale:
+        with contextlib.suppress(OSError):
+            path.unlink()
+    return bundle_path
+
+
+def _zip_open_stored(zip: zipfile.ZipFile, name: str) -> IO[bytes]:
+    # Parquet pages are already compressed, so store these members as-is and
+    # let the writer stream into the entry instead of buffering it first.
+    info = zipfile.ZipInfo(name, date_time=time.localtime(time.time())[:6])
+    info.compress_type = zipfile.ZIP_STORED
+    info.external_attr = 0o600 << 16
+    return zip.open(info, "w", force_zip64=True)
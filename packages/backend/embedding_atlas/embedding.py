@@ -1,6 +1,10 @@
 # Copyright (c) 2025 Apple Inc. Licensed under MIT License.
 
+import asyncio
+import os
 from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from io import BytesIO
 from typing import Any
 
@@ -10,9 +14,18 @@ from .utils import logger
 
 
 def create_embedder(
-    name: str, *, modality: str, model: str | None, embedder_args: dict
+    name: str,
+    *,
+    modality: str,
+    model: str | None,
+    embedder_args: dict,
+    max_concurrency: int | None = None,
 ) -> Callable:
-    """Create a built-in embedder function by name."""
+    """Create a built-in embedder function by name.
+
+    ``max_concurrency`` bounds the number of requests a remote embedder keeps in
+    flight across all batches (default 1).
+    """
     factories = {
         "sentence-transformers": _create_sentence_transformers_embedder,
         "transformers": _create_transformers_embedder,
@@ -22,6 +35,13 @@ def create_embedder(
         raise ValueError(
             f"Unknown embedder: {name}. Must be one of: {list(factories.keys())}"
         )
+    if name == "litellm":
+        return _create_litellm_embedder(
+            modality=modality,
+            model=model,
+            embedder_args=embedder_args,
+            max_concurrency=max_concurrency,
+        )
     return factories[name](modality=modality, model=model, embedder_args=embedder_args)
 
 
@@ -70,6 +90,7 @@ def _create_transformers_text_embedder(
     *, model: str | None, embedder_args: dict
 ) -> Callable:
     """Return an async embedder backed by a HuggingFace feature-extraction pipeline."""
+    import torch
     from transformers import pipeline
 
     model_name = model or "sentence-transformers/all-MiniLM-L6-v2"
@@ -79,14 +100,9 @@ def _create_transformers_text_embedder(
     async def _embed(
         batch: list[Any], *, model: str | None, embedder_args: dict
     ) -> np.ndarray:
-        outputs = pipe(batch)
-        embeddings = []
-        for output in outputs:
-            arr = np.array(output)
-            if arr.ndim > 1:
-                arr = arr.mean(axis=tuple(range(arr.ndim - 1)))
-            embeddings.append(arr)
-        return np.stack(embeddings).astype(np.float32)
+        with torch.inference_mode():
+            outputs = pipe(batch, return_tensors=True)
+        return _mean_pool_tensors(outputs)  # type: ignore
 
     return _embed
 
@@ -95,6 +111,7 @@ def _create_transformers_image_embedder(
     *, model: str | None, embedder_args: dict
 ) -> Callable:
     """Return an async embedder backed by a HuggingFace image-feature-extraction pipeline."""
+    import torch
     from transformers import pipeline
 
     model_name = model or "google/vit-base-patch16-224"
@@ -104,21 +121,55 @@ def _create_transformers_image_embedder(
     async def _embed(
         batch: list[Any], *, model: str | None, embedder_args: dict
     ) -> np.ndarray:
-        from PIL import Image
-
-        images = [Image.open(BytesIO(item["bytes"])).convert("RGB") for item in batch]
-        outputs = pipe(images)  # type: ignore
-        embeddings = []
-        for output in outputs:
-            arr = np.array(output)
-            if arr.ndim > 1:
-                arr = arr.mean(axis=tuple(range(arr.ndim - 1)))
-            embeddings.append(arr)
-        return np.stack(embeddings).astype(np.float32)
+        loop = asyncio.get_running_loop()
+        images = await asyncio.gather(
+            *(
+                loop.run_in_executor(_decode_executor(), _load_rgb_image, item)
+                for item in batch
+            )
+        )
+        with torch.inference_mode():
+            outputs = pipe(images, return_tensors=True)  # type: ignore
+        return _mean_pool_tensors(outputs)  # type: ignore
 
     return _embed
 
 
+@lru_cache(maxsize=None)
+def _decode_executor() -> ThreadPoolExecutor:
+    """Return the thread pool shared by all image embedders for decoding.
+
+    PIL releases the GIL while decoding, so the images of a batch are decoded in
+    parallel.
+    """
+    return ThreadPoolExecutor(
+        max_workers=min(8, os.cpu_count() or 1), thread_name_prefix="image-decode"
+    )
+
+
+def _mean_pool_tensors(outputs: list) -> np.ndarray:
+    """Mean-pool each pipeline output tensor over all but its last axis and stack them.
+
+    Keeping the outputs as tensors avoids round-tripping the per-token features
+    through nested Python lists, and the stacked result is copied to the host once.
+    """
+    import torch
+
+    pooled = []
+    for output in outputs:
+        output = output.to(torch.float32)
+        if output.ndim > 1:
+            output = output.reshape(-1, output.shape[-1]).mean(dim=0)
+        pooled.append(output)
+    return torch.stack(pooled).cpu().numpy()
+
+
+def _load_rgb_image(item: dict) -> Any:
+    from PIL import Image
+
+    return Image.open(BytesIO(item["bytes"])).convert("RGB")
+
+
 def _create_transformers_audio_embedder(
     *, model: str | None, embedder_args: dict
 ) -> Callable:
@@ -168,7 +219,7 @@ def _create_transformers_audio_embedder(
             padding=True,  # type: ignore
         ).to(device)
 
-        with torch.no_grad():
+        with torch.inference_mode():
             audio_embeds = clap_model.get_audio_features(**inputs)
 
         if hasattr(audio_embeds, "pooler_output"):
@@ -179,13 +230,20 @@ def _create_transformers_audio_embedder(
 
 
 def _create_litellm_embedder(
-    *, modality: str, model: str | None, embedder_args: dict
+    *,
+    modality: str,
+    model: str | None,
+    embedder_args: dict,
+    max_concurrency: int | None = None,
 ) -> Callable:
     """Return an async embedder backed by LiteLLM."""
 
     if model is None:
         raise ValueError("model must be specified with the litellm embedder")
 
+    # Shared by all batches, so at most max_concurrency requests are in flight.
+    request_semaphore = asyncio.Semaphore(max_concurrency or 1)
+
     async def _embed(
         batch: list[Any], *, model: str | None, embedder_args: dict
     ) -> np.ndarray:
@@ -197,22 +255,27 @@ def _create_litellm_embedder(
         if modality == "image":
             import base64
 
-            embeddings = []
-            for item in batch:
+            async def embed_image(item: dict):
                 b64 = base64.b64encode(item["bytes"]).decode("ascii")
+                async with request_semaphore:
+                    response = await aembedding(
+                        input=[f"data:image/png;base64,{b64}"],
+                        model=model,
+                        **embedder_args,
+                    )
+                return response.data[0]["embedding"]
+
+            # Images are sent one per request; issue the requests of a batch
+            # concurrently, up to the shared limit.
+            embeddings = await asyncio.gather(*(embed_image(item) for item in batch))
+            return np.array(embeddings)
+        else:
+            async with request_semaphore:
                 response = await aembedding(
-                    input=[f"data:image/png;base64,{b64}"],
+                    input=batch,
                     model=model,
                     **embedder_args,
                 )
-                embeddings.append(response.data[0]["embedding"])
-            return np.array(embeddings)
-        else:
-            response = await aembedding(
-                input=batch,
-                model=model,
-                **embedder_args,
-            )
             return np.array([item["embedding"] for item in response.data])
 
     return _embed
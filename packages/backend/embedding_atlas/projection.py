@@ -1,6 +1,8 @@
 # Copyright (c) 2025 Apple Inc. Licensed under MIT License.
 
 import asyncio
+import struct
+import warnings
 from collections.abc import Callable
 from dataclasses import dataclass
 from pathlib import Path
@@ -8,9 +10,11 @@ from typing import IO
 
 import narwhals as nw
 import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
 from narwhals.typing import IntoDataFrameT
 
-from .cache import async_file_cache_value
+from .cache import async_file_cache_value, file_cache_value
 from .embedding import create_embedder
 from .utils import logger
 
@@ -31,6 +35,7 @@ def compute_projection(
     max_concurrency: int | None = None,
     embedder_args: dict | None = None,
     umap_args: dict | None = None,
+    umap_backend: str = "umap-learn",
     cache_root: str | Path | None = None,
 ) -> IntoDataFrameT:
     """
@@ -68,6 +73,9 @@ def compute_projection(
         max_concurrency: int or None, maximum number of concurrent batches.
         embedder_args: dict, embedder-specific arguments (e.g., api_key, api_base).
         umap_args: dict, arguments for the UMAP algorithm.
+        umap_backend: str, the UMAP implementation: 'umap-learn', 'cuml' (GPU,
+            requires RAPIDS cuML), or 'auto' to use cuML when a CUDA device is
+            available and umap-learn otherwise.
         cache_root: str or Path or None, root directory for caching results.
 
     Returns:
@@ -87,6 +95,7 @@ def compute_projection(
             max_concurrency=max_concurrency,
             embedder_args=embedder_args,
             umap_args=umap_args,
+            umap_backend=umap_backend,
             cache_root=cache_root,
         )
     )
@@ -106,6 +115,7 @@ async def async_compute_projection(
     max_concurrency: int | None = None,
     embedder_args: dict | None = None,
     umap_args: dict | None = None,
+    umap_backend: str = "umap-learn",
     cache_root: str | Path | None = None,
 ) -> IntoDataFrameT:
     """
@@ -122,6 +132,7 @@ async def async_compute_projection(
     series = nw_frame[inputs]
     embedder_args = embedder_args or {}
     umap_args = umap_args or {}
+    umap_backend = _resolve_umap_backend(umap_backend)
 
     # 1. Infer modality
     if modality == "auto":
@@ -130,11 +141,17 @@ async def async_compute_projection(
 
     # 2. Convert inputs to canonical format
     if modality == "text":
-        canonical = _to_canonical_text(series)
+        # Keep the Arrow array around: it doubles as the (cheaply hashed) cache key.
+        text_array = _to_text_array(series)
+        canonical = text_array.to_pylist()
+        inputs_key = text_array
     elif modality in ("image", "audio"):
         canonical = _to_canonical_binary(series)
+        # Hash the payloads in place; building an Arrow array would copy them.
+        inputs_key = [item["bytes"] for item in canonical]
     elif modality == "vector":
         canonical = _to_canonical_vector(series)
+        inputs_key = canonical
     else:
         raise ValueError(
             f"Unknown modality: {modality}. Must be one of: text, image, audio, vector, auto"
@@ -165,17 +182,20 @@ async def async_compute_projection(
 
     cache_key = {
         "version": 1,
-        "inputs": canonical,
+        "inputs": inputs_key,
         "modality": modality,
         "embedder": embedder_name,
         "model": model,
         "umap_args": umap_args,
         "embedder_args": _caching_embedder_args(embedder_args),
     }
+    if umap_backend != "umap-learn":
+        # Only added for other backends, so existing umap-learn entries still hit.
+        cache_key["umap_backend"] = umap_backend
 
     async def run() -> Projection:
         if modality == "vector":
-            embedding = np.array(canonical).astype(np.float32)
+            embedding = np.asarray(canonical)
         else:
             if callable(embedder):
                 embed_fn = embedder
@@ -185,6 +205,7 @@ async def async_compute_projection(
                     modality=modality,
                     model=model,
                     embedder_args=embedder_args,
+                    max_concurrency=max_concurrency,
                 )
             else:
                 raise RuntimeError("unreachable")
@@ -197,7 +218,12 @@ async def async_compute_projection(
                 max_concurrency=max_concurrency,
             )
 
-        return _run_umap(embedding, umap_args=umap_args)
+        return _run_umap(
+            embedding,
+            umap_args=umap_args,
+            backend=umap_backend,
+            cache_root=cache_root,
+        )
 
     proj = await async_file_cache_value(
         cache_key,
@@ -212,23 +238,35 @@ async def async_compute_projection(
     )
 
     # Create a new data frame with the columns from the original, and add proj columns to it.
-    backend = nw.get_native_namespace(nw_frame)
-    new_columns = [
-        nw.new_series(x, proj.projection[:, 0].tolist(), nw.Float64, backend=backend),
-        nw.new_series(y, proj.projection[:, 1].tolist(), nw.Float64, backend=backend),
-    ]
+    # The new columns are assembled as Arrow arrays straight from the numpy results.
+    columns = {
+        x: pa.array(proj.projection[:, 0], type=pa.float64()),
+        y: pa.array(proj.projection[:, 1], type=pa.float64()),
+    }
     if neighbors is not None:
-        new_columns.append(
-            nw.new_series(
-                neighbors,
-                [
-                    {"distances": b, "ids": a}
-                    for a, b in zip(proj.knn_indices, proj.knn_distances)
-                ],
-                backend=backend,
-            )
-        )
-    return nw.to_native(nw_frame.with_columns(new_columns))
+        columns[neighbors] = _neighbors_array(proj.knn_indices, proj.knn_distances)
+    new_frame = nw.from_arrow(
+        pa.table(columns), backend=nw.get_native_namespace(nw_frame)
+    )
+    return nw.to_native(nw_frame.with_columns([new_frame[name] for name in columns]))
+
+
+def _neighbors_array(knn_indices: np.ndarray, knn_distances: np.ndarray) -> pa.Array:
+    """Build the neighbors column, a struct of ``distances`` and ``ids`` lists per row.
+
+    Every row has the same number of neighbors, so the lists are fixed-size and
+    need no per-row offsets.
+    """
+    k = knn_indices.shape[1]
+    return pa.StructArray.from_arrays(
+        [
+            pa.FixedSizeListArray.from_arrays(pa.array(knn_distances.ravel()), k),
+            pa.FixedSizeListArray.from_arrays(
+                pa.array(knn_indices.ravel(), type=pa.int32()), k
+            ),
+        ],
+        names=["distances", "ids"],
+    )
 
 
 def _detect_binary_modality(data: bytes) -> str:
@@ -301,7 +339,20 @@ def _infer_modality(series: nw.Series) -> str:
 
 def _to_canonical_text(series: nw.Series) -> list[str]:
     """Convert series to canonical text format: list[str] with nulls as 'null'."""
-    return series.fill_null("null").cast(nw.String).to_list()
+    return _to_text_array(series).to_pylist()
+
+
+def _to_text_array(series: nw.Series) -> pa.Array:
+    """Convert series to a large_string Arrow array with nulls as 'null'."""
+    if series.dtype != nw.String:
+        series = series.fill_null("null").cast(nw.String)
+    array = series.to_arrow()
+    if isinstance(array, pa.ChunkedArray):
+        array = array.combine_chunks()
+    array = array.cast(pa.large_string())
+    if array.null_count > 0:
+        array = pc.fill_null(array, "null")
+    return array
 
 
 def _to_canonical_binary(series: nw.Series) -> list[dict]:
@@ -322,14 +373,27 @@ def _to_canonical_binary(series: nw.Series) -> list[dict]:
     return result
 
 
-def _to_canonical_vector(series: nw.Series) -> list[np.ndarray]:
-    """Convert series to canonical vector format: list[ndarray[float32]]."""
-    result = []
-    for value in series.to_list():
-        if isinstance(value, np.ndarray):
-            result.append(value.astype(np.float32))
-        else:
-            result.append(np.array(value, dtype=np.float32))
+def _to_canonical_vector(series: nw.Series) -> np.ndarray:
+    """Convert series to canonical vector format: ndarray[float32] with shape (N, dim)."""
+    if isinstance(series.dtype, (nw.List, nw.Array)) and series.null_count() == 0:
+        # Arrow-backed list columns: reshape the flat child values in one pass.
+        array = series.to_arrow()
+        if isinstance(array, pa.ChunkedArray):
+            array = array.combine_chunks()
+        lengths = pc.list_value_length(array)
+        if len(array) > 0 and pc.min(lengths) == pc.max(lengths):
+            values = array.flatten().to_numpy(zero_copy_only=False)
+            return values.astype(np.float32, copy=False).reshape(len(array), -1)
+    try:
+        result = np.asarray(series.to_list(), dtype=np.float32)
+    except ValueError as e:
+        raise ValueError(
+            "Cannot convert vector column: all values must be numeric vectors of the same length"
+        ) from e
+    if result.ndim != 2:
+        raise ValueError(
+            f"Cannot convert vector column: expected 1-dimensional vectors, got shape {result.shape[1:]}"
+        )
     return result
 
 
@@ -343,53 +407,179 @@ class Projection:
 
     @staticmethod
     def serialize(value: "Projection", fd: IO[bytes]) -> None:
-        np.savez(
-            fd,
-            projection=value.projection,
-            knn_indices=value.knn_indices,
-            knn_distances=value.knn_distances,
-        )
+        fd.write(_PROJECTION_MAGIC)
+        for name in _PROJECTION_FIELDS:
+            _write_array(fd, np.ascontiguousarray(getattr(value, name)))
 
     @staticmethod
     def deserialize(fd: IO[bytes]) -> "Projection":
-        d = np.load(fd, allow_pickle=False)
-        return Projection(
-            projection=d["projection"],
-            knn_indices=d["knn_indices"],
-            knn_distances=d["knn_distances"],
+        magic = fd.read(len(_PROJECTION_MAGIC))
+        if magic != _PROJECTION_MAGIC:
+            # Legacy layout: a single .npz archive.
+            fd.seek(0)
+            d = np.load(fd, allow_pickle=False)
+            return Projection(**{name: d[name] for name in _PROJECTION_FIELDS})
+        return Projection(**{name: _read_array(fd) for name in _PROJECTION_FIELDS})
+
+
+# Serialized projections are a magic header followed by each array in
+# _PROJECTION_FIELDS order, stored as (dtype, shape) and the raw contiguous data.
+# This avoids the zip container of np.savez and reads each array with one copy.
+_PROJECTION_MAGIC = b"EAPROJ\x00\x01"
+_PROJECTION_FIELDS = ("projection", "knn_indices", "knn_distances")
+
+
+def _write_array(fd: IO[bytes], array: np.ndarray):
+    dtype = array.dtype.str.encode("ascii")
+    fd.write(struct.pack("<BB", len(dtype), array.ndim))
+    fd.write(dtype)
+    fd.write(struct.pack(f"<{array.ndim}Q", *array.shape))
+    fd.write(array.reshape(-1).view(np.uint8))
+
+
+def _read_array(fd: IO[bytes]) -> np.ndarray:
+    dtype_length, ndim = struct.unpack("<BB", fd.read(2))
+    dtype = np.dtype(fd.read(dtype_length).decode("ascii"))
+    shape = struct.unpack(f"<{ndim}Q", fd.read(8 * ndim))
+    array = np.empty(shape, dtype=dtype)
+    view = array.reshape(-1).view(np.uint8)
+    if fd.readinto(view) != len(view):  # type: ignore
+        raise ValueError("truncated projection data")
+    return array
+
+
+def _resolve_umap_backend(backend: str) -> str:
+    if backend == "auto":
+        backend = "cuml" if _cuml_available() else "umap-learn"
+        logger.info("Using UMAP backend: %s", backend)
+    if backend not in ("umap-learn", "cuml"):
+        raise ValueError(
+            f"Unknown UMAP backend: {backend}. Must be one of: umap-learn, cuml, auto"
         )
+    return backend
+
+
+def _cuml_available() -> bool:
+    """Return whether cuML is installed and a CUDA device is usable."""
+    try:
+        import cuml  # noqa: F401
+        import cupy
+    except ImportError:
+        return False
+    try:
+        return cupy.cuda.runtime.getDeviceCount() > 0
+    except cupy.cuda.runtime.CUDARuntimeError:
+        return False
 
 
 def _run_umap(
     hidden_vectors: np.ndarray,
     *,
     umap_args: dict | None = None,
+    backend: str = "umap-learn",
+    cache_root: str | Path | None = None,
 ) -> Projection:
     if umap_args is None:
         umap_args = {}
 
+    if hidden_vectors.dtype != np.float32 or not hidden_vectors.flags.c_contiguous:
+        # NNDescent and UMAP would otherwise each make their own converted copy.
+        logger.debug("Converting UMAP input from %s to float32", hidden_vectors.dtype)
+        hidden_vectors = np.ascontiguousarray(hidden_vectors, dtype=np.float32)
+
     logger.info("Running UMAP for input with shape %s...", str(hidden_vectors.shape))  # type: ignore
 
-    import umap
-    from umap.umap_ import nearest_neighbors
+    if backend == "cuml":
+        from cuml.manifold import UMAP
+    else:
+        from umap import UMAP
 
     metric = umap_args.get("metric", "cosine")
     n_neighbors = umap_args.get("n_neighbors", 15)
 
-    knn = nearest_neighbors(
+    knn_indices, knn_distances = _compute_knn(
         hidden_vectors,
-        n_neighbors=n_neighbors,
         metric=metric,
-        metric_kwds=None,
-        angular=False,
+        n_neighbors=n_neighbors,
         random_state=umap_args.get("random_state"),
+        backend=backend,
+        cache_root=cache_root,
     )
 
     kwargs = {k: v for k, v in umap_args.items() if k != "metric"}
-    proj = umap.UMAP(**kwargs, precomputed_knn=knn, metric=metric)
-    result: np.ndarray = proj.fit_transform(hidden_vectors)  # type: ignore
+    proj = UMAP(**kwargs, precomputed_knn=(knn_indices, knn_distances), metric=metric)
+    with warnings.catch_warnings():
+        # We never call transform(), so the missing NNDescent search index is fine.
+        warnings.filterwarnings("ignore", message=r"precomputed_knn\[2\]")
+        result: np.ndarray = proj.fit_transform(hidden_vectors)  # type: ignore
+
+    return Projection(
+        projection=result, knn_indices=knn_indices, knn_distances=knn_distances
+    )
+
+
+def _compute_knn(
+    hidden_vectors: np.ndarray,
+    *,
+    metric: str,
+    n_neighbors: int,
+    random_state: int | None,
+    backend: str = "umap-learn",
+    cache_root: str | Path | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Compute the k-nearest neighbors of the vectors, cached separately from the
+    UMAP layout so that changing layout parameters (e.g. min_dist) reuses them."""
+
+    def run():
+        if backend == "cuml":
+            # Exact (brute-force) neighbors on the GPU.
+            from cuml.neighbors import NearestNeighbors
+
+            nn = NearestNeighbors(n_neighbors=n_neighbors, metric=metric)
+            distances, indices = nn.fit(hidden_vectors).kneighbors(hidden_vectors)
+            knn = (np.asarray(indices), np.asarray(distances))
+        else:
+            from umap.umap_ import nearest_neighbors
+
+            knn = nearest_neighbors(
+                hidden_vectors,
+                n_neighbors=n_neighbors,
+                metric=metric,
+                metric_kwds=None,
+                angular=False,
+                random_state=random_state,
+            )
+        # Store the neighbors compactly: row ids fit in int32 and float32 distances
+        # are plenty for the layout and the neighbors column.
+        knn_indices = knn[0]
+        if len(hidden_vectors) < 2**31:
+            knn_indices = knn_indices.astype(np.int32, copy=False)
+        return (knn_indices, knn[1].astype(np.float32, copy=False))
+
+    cache_key = {
+        "version": 2,
+        "vectors": hidden_vectors,
+        "metric": metric,
+        "n_neighbors": n_neighbors,
+        "random_state": random_state,
+    }
+    return file_cache_value(
+        cache_key,
+        run,
+        scope="compute_knn" if backend == "umap-learn" else "compute_knn_cuml",
+        serializer=_serialize_knn,
+        deserializer=_deserialize_knn,
+        cache_root=cache_root,
+    )
+
+
+def _serialize_knn(value: tuple[np.ndarray, np.ndarray], fd: IO[bytes]) -> None:
+    for array in value:
+        _write_array(fd, np.ascontiguousarray(array))
+
 
-    return Projection(projection=result, knn_indices=knn[0], knn_distances=knn[1])
+def _deserialize_knn(fd: IO[bytes]) -> tuple[np.ndarray, np.ndarray]:
+    return (_read_array(fd), _read_array(fd))
 
 
 async def _run_embedding(
@@ -2,21 +2,39 @@
 
 import asyncio
 import concurrent.futures
+import contextlib
+import hashlib
 import json
+import os
 import re
-import uuid
-from functools import lru_cache, partial
-from io import BytesIO
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from collections.abc import Iterator
+from functools import partial
 from typing import Callable
 
 import duckdb
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv
+import pyarrow.parquet as pq
+from duckdb.sqltypes import DuckDBPyType
 from fastapi import FastAPI, HTTPException, Request, Response, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 
 from .data_source import DataSource
-from .utils import arrow_to_bytes, to_parquet_bytes
+from .utils import iter_arrow_ipc, json_dumps, json_loads, write_parquet
+
+# Rows per record batch when streaming Arrow query results.
+ARROW_BATCH_SIZE = 1_000_000
+
+# Total size of the query response cache, and the largest single response kept.
+QUERY_CACHE_BYTES = 128 * 1024 * 1024
+QUERY_CACHE_ENTRY_BYTES = 16 * 1024 * 1024
 
 
 def make_server(
@@ -26,12 +44,22 @@ def make_server(
     mcp: bool = False,
     cors: bool | list[str] = False,
     duckdb_uri: str | None = None,
+    max_workers: int | None = None,
 ):
     """Creates a server for hosting Embedding Atlas"""
 
     additional_tables = data_source.additional_tables
 
-    app = FastAPI()
+    # Run when the server shuts down, in order of registration.
+    shutdown_callbacks: list[Callable[[], None]] = []
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app: FastAPI):
+        yield
+        for callback in shutdown_callbacks:
+            callback()
+
+    app = FastAPI(lifespan=lifespan)
 
     if cors is not None:
         if isinstance(cors, bool) and cors:
@@ -51,27 +79,54 @@ def make_server(
                 expose_headers=["*"],
             )
 
-    mount_bytes(
+    # Worker threads mostly wait on DuckDB, which parallelizes each query on its
+    # own, so a pool of about half the cores keeps requests from queueing without
+    # oversubscribing the CPU.
+    if max_workers is None:
+        max_workers = max(4, (os.cpu_count() or 1) // 2)
+    executor = concurrent.futures.ThreadPoolExecutor(
+        max_workers=max_workers, thread_name_prefix="embedding-atlas"
+    )
+
+    # Parquet files are written here once and served from disk. The directory is
+    # removed when the app is garbage collected or the process exits.
+    app.state.temporary_directory = tempfile.TemporaryDirectory(
+        prefix="embedding-atlas-"
+    )
+    temporary_directory = app.state.temporary_directory.name
+
+    # Only the in-browser (wasm) database downloads the parquet files, so only
+    # prepare them ahead of the first request in that mode.
+    wasm = duckdb_uri is None or duckdb_uri == "wasm"
+
+    mount_file(
         app,
         "/data/dataset.parquet",
         "application/octet-stream",
-        partial(to_parquet_bytes, data_source.dataset),
+        # Shares the data source's encoded file with the archive and exports.
+        lambda path: link_or_copy(data_source.dataset_parquet_path(), path),
+        executor=executor,
+        directory=temporary_directory,
+        precompute=wasm,
     )
 
     if additional_tables:
         for name, df in additional_tables.items():
-            mount_bytes(
+            mount_file(
                 app,
                 f"/data/tables/{name}.parquet",
                 "application/octet-stream",
-                partial(to_parquet_bytes, df),
+                partial(write_parquet, df),
+                executor=executor,
+                directory=temporary_directory,
+                precompute=wasm,
             )
 
     @app.get("/data/metadata.json")
     async def get_metadata():
         meta = {}
         # Database
-        if duckdb_uri is None or duckdb_uri == "wasm":
+        if wasm:
             db_meta: dict = {"type": "wasm", "load": True}
             if additional_tables:
                 db_meta["additionalTables"] = [
@@ -104,21 +159,47 @@ def make_server(
 
         return data_source.metadata | meta
 
+    # The archive embeds the dataset, the static files and the cache entries;
+    # it is rebuilt when any of them may have changed.
+    archive_state: dict = {"cache_version": 0, "key": None, "data": None}
+
+    def build_archive() -> bytes:
+        key = (
+            id(data_source.dataset),
+            os.path.getmtime(static_path),
+            archive_state["cache_version"],
+        )
+        if archive_state["key"] == key:
+            return archive_state["data"]
+        data = data_source.make_archive(static_path)
+        archive_state["key"], archive_state["data"] = key, data
+        return data
+
+    @app.get("/data/archive.zip")
+    async def make_archive():
+        data = await asyncio.get_running_loop().run_in_executor(executor, build_archive)
+        return Response(content=data, media_type="application/zip")
+
+    # Cache entries can be large, and reading or writing one means JSON coding,
+    # encryption, and file I/O, so both directions run on the worker pool.
     @app.post("/data/cache/{name}")
     async def post_cache(request: Request, name: str):
-        data_source.cache_set(name, await request.json())
+        body = await request.body()
+        await asyncio.get_running_loop().run_in_executor(
+            executor, lambda: data_source.cache_set(name, json_loads(body))
+        )
+        archive_state["cache_version"] += 1
 
     @app.get("/data/cache/{name}")
     async def get_cache(name: str):
-        obj = data_source.cache_get(name)
-        if obj is None:
-            return Response(status_code=404)
-        return obj
+        def read() -> bytes | None:
+            obj = data_source.cache_get(name)
+            return None if obj is None else json_dumps(obj)
 
-    @app.get("/data/archive.zip")
-    async def make_archive():
-        data = data_source.make_archive(static_path)
-        return Response(content=data, media_type="application/zip")
+        data = await asyncio.get_running_loop().run_in_executor(executor, read)
+        if data is None:
+            return Response(status_code=404)
+        return Response(data, media_type="application/json")
 
     if duckdb_uri == "server":
         duckdb_connection = make_duckdb_connection(
@@ -127,31 +208,149 @@ def make_server(
     else:
         duckdb_connection = None
 
+    # The viewer re-issues identical queries (e.g., while panning), so keep recent
+    # responses. Entries are dropped whenever an "exec" statement runs, since it
+    # may change the tables.
+    query_cache = ResponseCache(QUERY_CACHE_BYTES)
+
+    # Each worker thread keeps one cursor for read-only requests whose results
+    # are fully consumed before returning, instead of creating a cursor per
+    # request. Session state (SET options, temporary objects) belongs to a
+    # cursor, so it must not leak into these: "exec" statements run on a cursor
+    # of their own, and a thread's cursor is discarded after any statement that
+    # returns no rows. As before, such state is not visible across requests.
+    thread_local = threading.local()
+    thread_cursors: set[duckdb.DuckDBPyConnection] = set()
+    thread_cursors_lock = threading.Lock()
+
+    def thread_cursor() -> duckdb.DuckDBPyConnection:
+        assert duckdb_connection is not None
+        cursor = getattr(thread_local, "cursor", None)
+        if cursor is None:
+            cursor = duckdb_connection.cursor()
+            thread_local.cursor = cursor
+            with thread_cursors_lock:
+                thread_cursors.add(cursor)
+        return cursor
+
+    def discard_thread_cursor():
+        cursor = getattr(thread_local, "cursor", None)
+        if cursor is not None:
+            thread_local.cursor = None
+            with thread_cursors_lock:
+                thread_cursors.discard(cursor)
+            cursor.close()
+
+    def close_thread_cursors():
+        with thread_cursors_lock:
+            cursors = list(thread_cursors)
+            thread_cursors.clear()
+        for cursor in cursors:
+            cursor.close()
+
+    shutdown_callbacks.append(close_thread_cursors)
+
+    async def stream_arrow(
+        cursor: duckdb.DuckDBPyConnection,
+        chunks: Iterator[bytes],
+        chunk: bytes,
+        cache_key: bytes,
+        generation: int,
+    ):
+        # The remaining batches are fetched and encoded on the worker pool. An
+        # error there propagates and aborts the response, so the client doesn't
+        # mistake a partial stream for a complete one.
+        cached: list[bytes] | None = []
+        size = 0
+        pending: concurrent.futures.Future | None = None
+        try:
+            while True:
+                if cached is not None:
+                    size += len(chunk)
+                    if size <= QUERY_CACHE_ENTRY_BYTES:
+                        cached.append(chunk)
+                    else:
+                        cached = None
+                yield chunk
+                pending = executor.submit(next, chunks, None)
+                next_chunk = await asyncio.wrap_future(pending)
+                if next_chunk is None:
+                    break
+                chunk = next_chunk
+        finally:
+            # The cursor must outlive the reader. If the client went away while a
+            # batch was being fetched, close it once that fetch is done.
+            if pending is not None and not pending.done():
+                pending.add_done_callback(lambda _: cursor.close())
+            else:
+                cursor.close()
+        if cached is not None:
+            query_cache.put(cache_key, b"".join(cached), generation)
+
     def handle_query(query: dict):
         assert duckdb_connection is not None
         sql = query["sql"]
         command = query["type"]
-        with duckdb_connection.cursor() as cursor:
-            try:
-                result = cursor.sql(sql)
-                if command == "exec":
-                    return JSONResponse({})
-                elif command == "arrow":
-                    if result is None:
-                        return JSONResponse(
-                            {"error": "statement must return rows"}, status_code=500
-                        )
-                    buf = arrow_to_bytes(result.fetch_arrow_reader())
-                    return Response(
-                        buf, headers={"Content-Type": "application/octet-stream"}
+        cache_key = hashlib.sha256(f"{command}\x00{sql}".encode()).digest()
+        generation = query_cache.generation
+        if command in ("arrow", "json"):
+            cached = query_cache.get(cache_key)
+            if cached is not None:
+                media_type = (
+                    "application/json"
+                    if command == "json"
+                    else "application/octet-stream"
+                )
+                return Response(cached, headers={"Content-Type": media_type})
+        if command == "arrow":
+            return handle_arrow_query(sql, cache_key, generation)
+        try:
+            if command == "exec":
+                with duckdb_connection.cursor() as cursor:
+                    cursor.sql(sql)
+                query_cache.clear()
+                return JSONResponse({})
+            elif command == "json":
+                result = thread_cursor().sql(sql)
+                if result is None:
+                    discard_thread_cursor()
+                    return JSONResponse(
+                        {"error": "statement must return rows"}, status_code=500
                     )
-                elif command == "json":
-                    data = result.df().to_json(orient="records")
-                    return Response(data, headers={"Content-Type": "application/json"})
-                else:
-                    raise ValueError(f"Unknown command {command}")
-            except Exception as e:
-                return JSONResponse({"error": str(e)}, status_code=500)
+                data = relation_to_json(result)
+                if len(data) <= QUERY_CACHE_ENTRY_BYTES:
+                    query_cache.put(cache_key, data, generation)
+                return Response(data, headers={"Content-Type": "application/json"})
+            else:
+                raise ValueError(f"Unknown command {command}")
+        except Exception as e:
+            return JSONResponse({"error": str(e)}, status_code=500)
+
+    def handle_arrow_query(sql: str, cache_key: bytes, generation: int):
+        assert duckdb_connection is not None
+        # A pending streamed result is invalidated by the next query on the same
+        # cursor, so each stream gets a cursor of its own.
+        cursor = duckdb_connection.cursor()
+        try:
+            result = cursor.sql(sql)
+            if result is None:
+                cursor.close()
+                return JSONResponse(
+                    {"error": "statement must return rows"}, status_code=500
+                )
+            # Executing the query and fetching the first batch surfaces errors
+            # here, while the status can still be set; the rest of the batches
+            # are encoded and sent as DuckDB produces them.
+            reader = result.fetch_arrow_reader(ARROW_BATCH_SIZE)
+            chunks = iter_arrow_ipc(reader)
+            chunk = next(chunks)
+        except Exception as e:
+            cursor.close()
+            return JSONResponse({"error": str(e)}, status_code=500)
+        return StreamingResponse(
+            stream_arrow(cursor, chunks, chunk, cache_key, generation),
+            media_type="application/octet-stream",
+        )
 
     def handle_selection(query: dict):
         assert duckdb_connection is not None
@@ -159,39 +358,34 @@ def make_server(
         format = query["format"]
 
         try:
-            with duckdb_connection.cursor() as cursor:
-                statement = (
-                    f"SELECT * FROM dataset WHERE {predicate}"
-                    if predicate is not None
-                    else "SELECT * FROM dataset"
-                )
-                # Convert to DataFrame and save since we've disabled DuckDB filesystem access
-                result = cursor.sql(statement).to_df()
-
-                output = BytesIO()
-                if format == "parquet":
-                    result.to_parquet(output, index=False)
-                elif format == "json":
-                    result.to_json(output, orient="records", index=False)
-                elif format == "jsonl":
-                    result.to_json(output, orient="records", lines=True, index=False)
-                elif format == "csv":
-                    result.to_csv(output, index=False)
-                else:
-                    raise ValueError("invalid format")
-
-                return Response(
-                    output.getvalue(),
-                    headers={"Content-Type": "application/octet-stream"},
-                )
+            # Build the relation instead of formatting SQL text: filter() parses the
+            # predicate as a single expression, so it cannot smuggle in statements.
+            result = thread_cursor().table("dataset")
+            if predicate is not None:
+                result = result.filter(predicate)
+            # Serialize in memory since we've disabled DuckDB filesystem access
+            # (so COPY ... TO is unavailable).
+            if format == "parquet":
+                data = relation_to_parquet(result)
+            elif format == "json":
+                data = relation_to_json(result)
+            elif format == "jsonl":
+                data = relation_to_json(result, lines=True)
+            elif format == "csv":
+                data = relation_to_csv(result)
+            else:
+                raise ValueError("invalid format")
+
+            return Response(
+                data,
+                headers={"Content-Type": "application/octet-stream"},
+            )
         except Exception as e:
             return JSONResponse({"error": str(e)}, status_code=500)
 
-    executor = concurrent.futures.ThreadPoolExecutor()
-
     @app.get("/data/query")
     async def get_query(req: Request):
-        data = json.loads(req.query_params["query"])
+        data = json_loads(req.query_params["query"])
         return await asyncio.get_running_loop().run_in_executor(
             executor, lambda: handle_query(data)
         )
@@ -199,7 +393,7 @@ def make_server(
     @app.post("/data/query")
     async def post_query(req: Request):
         body = await req.body()
-        data = json.loads(body)
+        data = json_loads(body)
         return await asyncio.get_running_loop().run_in_executor(
             executor, lambda: handle_query(data)
         )
@@ -207,7 +401,7 @@ def make_server(
     @app.post("/data/selection")
     async def post_selection(req: Request):
         body = await req.body()
-        data = json.loads(body)
+        data = json_loads(body)
         return await asyncio.get_running_loop().run_in_executor(
             executor, lambda: handle_selection(data)
         )
@@ -216,30 +410,81 @@ def make_server(
         make_mcp_proxy(app)
 
     # Static files for the frontend
-    app.mount("/", StaticFiles(directory=static_path, html=True))
+    app.mount("/", ViewerStaticFiles(directory=static_path, html=True))
 
     return app
 
 
+class ResponseCache:
+    """A thread-safe LRU cache of response bodies, bounded by their total size.
+
+    ``generation`` advances on every ``clear()``; a ``put()`` for a response that
+    was computed before the latest clear is ignored.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.generation = 0
+        self.entries: OrderedDict[bytes, bytes] = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key: bytes) -> bytes | None:
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+            return value
+
+    def put(self, key: bytes, value: bytes, generation: int):
+        if len(value) > self.max_bytes:
+            return
+        with self.lock:
+            if generation != self.generation:
+                return
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self.entries[key] = value
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+            self.generation += 1
+
+
 class WebSocketHandler:
     def __init__(self, websocket: WebSocket):
         self.websocket = websocket
         self.pending_requests: dict[str, asyncio.Future] = {}
         self.is_connected = True
+        self._next_id = 0
 
     async def handle_connection(self):
         try:
             while self.is_connected:
-                data = await self.websocket.receive_text()
+                # Accept both text and binary frames; the JSON parser takes
+                # either, so binary frames skip the UTF-8 decode into a str.
+                message = await self.websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                data = message.get("bytes")
+                if data is None:
+                    data = message.get("text")
                 await self._handle_message(data)
         except Exception as _:
             pass
         finally:
             await self._cleanup()
 
-    async def _handle_message(self, data: str):
+    async def _handle_message(self, data: bytes | str):
         try:
-            response = json.loads(data)
+            response = json_loads(data)
             request_id = response.get("id")
             if request_id and request_id in self.pending_requests:
                 future = self.pending_requests.pop(request_id)
@@ -262,32 +507,36 @@ class WebSocketHandler:
         if not self.is_connected:
             raise HTTPException(status_code=503, detail="WebSocket disconnected")
 
-        request_id = str(uuid.uuid4())
+        # Ids only need to be unique among this connection's pending requests.
+        self._next_id += 1
+        request_id = str(self._next_id)
         payload = {"id": request_id, "request": request}
 
-        future = asyncio.Future()
+        future = asyncio.get_running_loop().create_future()
         self.pending_requests[request_id] = future
 
         try:
-            await self.websocket.send_text(json.dumps(payload))
-            response = await asyncio.wait_for(future, timeout=30.0)
-            return response
+            await self.websocket.send_text(json_dumps(payload).decode("utf-8"))
+            async with asyncio.timeout(30.0):
+                return await future
 
-        except asyncio.TimeoutError:
-            self.pending_requests.pop(request_id, None)
+        except TimeoutError:
             raise HTTPException(status_code=408, detail="Request timeout")
         except Exception as e:
-            self.pending_requests.pop(request_id, None)
             if not self.is_connected:
                 raise HTTPException(status_code=503, detail="WebSocket disconnected")
             else:
                 raise HTTPException(
                     status_code=500, detail=f"Internal server error: {str(e)}"
                 )
+        finally:
+            self.pending_requests.pop(request_id, None)
 
     async def send_close(self):
         try:
-            await self.websocket.send_text(json.dumps({"control": "close"}))
+            await self.websocket.send_text(
+                json_dumps({"control": "close"}).decode("utf-8")
+            )
         except Exception:
             pass
 
@@ -321,7 +570,7 @@ def make_mcp_proxy(app: FastAPI):
         if handler is None or not handler.is_connected:
             raise HTTPException(status_code=503, detail="No MCP WebSocket connected")
 
-        return await handler.send_request(await request.json())
+        return await handler.send_request(json_loads(await request.body()))
 
 
 def make_duckdb_connection(df, additional_tables: dict | None = None):
@@ -334,61 +583,192 @@ def make_duckdb_connection(df, additional_tables: dict | None = None):
                 raise ValueError(f"invalid table name: {name!r}")
             _ = additional_df  # used in the query
             con.sql(f"CREATE TABLE {name} AS (SELECT * FROM additional_df)")
+    # Settings are database-wide, so the per-request cursors share them. DuckDB
+    # already runs (and collects Arrow results) on all cores by default; insertion
+    # order is kept because selections are exported in dataset order.
     con.sql("SET enable_external_access = false")
     con.sql("SET lock_configuration = true")
     return con
 
 
-def parse_range_header(request: Request, content_length: int):
-    value = request.headers.get("Range")
-    if value is not None:
-        m = re.match(r"^ *bytes *= *([0-9]+) *- *([0-9]+) *$", value)
-        if m is not None:
-            r0 = int(m.group(1))
-            r1 = int(m.group(2)) + 1
-            if r0 < r1 and r0 <= content_length and r1 <= content_length:
-                return (r0, r1)
+def quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def finite_expression(
+    expression: str, dtype: DuckDBPyType, depth: int = 0
+) -> str | None:
+    """Return an expression that replaces the non-finite floats in ``expression``
+    (including those nested in lists and structs) with NULL, or None if the type
+    contains no floats."""
+    if dtype.id in ("float", "double"):
+        return f"CASE WHEN isfinite({expression}) THEN {expression} END"
+    if dtype.id in ("list", "array"):
+        variable = f"__x{depth}"
+        child = finite_expression(variable, dict(dtype.children)["child"], depth + 1)
+        if child is None:
+            return None
+        return f"list_transform({expression}, lambda {variable}: {child})"
+    if dtype.id == "struct":
+        fields = []
+        changed = False
+        for name, child_type in dtype.children:
+            field = f"({expression}).{quote_identifier(name)}"
+            child = finite_expression(field, child_type, depth + 1)
+            changed = changed or child is not None
+            fields.append(f"{quote_identifier(name)} := {child or field}")
+        if not changed:
+            return None
+        return f"CASE WHEN {expression} IS NOT NULL THEN struct_pack({', '.join(fields)}) END"
     return None
 
 
-def mount_bytes(
-    app: FastAPI, url: str, media_type: str, make_content: Callable[[], bytes]
+def relation_to_json(relation: duckdb.DuckDBPyRelation, *, lines: bool = False):
+    """Serialize the rows of a relation as a JSON array, or as JSON lines."""
+    # DuckDB writes NaN and Infinity as bare (invalid JSON) tokens, so map them
+    # to null like pandas did.
+    columns = []
+    changed = False
+    for name, dtype in zip(relation.columns, relation.types):
+        column = quote_identifier(name)
+        expression = finite_expression(column, dtype)
+        changed = changed or expression is not None
+        columns.append(column if expression is None else f"{expression} AS {column}")
+    if changed:
+        relation = relation.project(", ".join(columns))
+    # DuckDB renders each row with its separator appended, so the rows of each
+    # Arrow batch are already contiguous in the string data buffer.
+    separator = "chr(10)" if lines else "','"
+    reader = relation.query(
+        "__rows", f"SELECT to_json(__rows) || {separator} FROM __rows"
+    ).fetch_arrow_reader()
+    chunks = []
+    for batch in reader:
+        column = batch.column(0).cast(pa.large_string())
+        if len(column) == 0:
+            continue
+        _, offsets_buffer, data_buffer = column.buffers()
+        offsets = np.frombuffer(offsets_buffer, dtype=np.int64)
+        start = int(offsets[column.offset])
+        end = int(offsets[column.offset + len(column)])
+        chunks.append(memoryview(data_buffer)[start:end])
+    data = b"".join(chunks)
+    if lines:
+        return data
+    return b"[" + data[:-1] + b"]"
+
+
+def relation_to_parquet(relation: duckdb.DuckDBPyRelation):
+    reader = relation.fetch_arrow_reader()
+    sink = pa.BufferOutputStream()
+    with pq.ParquetWriter(sink, reader.schema) as writer:
+        for batch in reader:
+            writer.write_batch(batch)
+    return memoryview(sink.getvalue())
+
+
+def relation_to_csv(relation: duckdb.DuckDBPyRelation):
+    # The Arrow CSV writer rejects nested types, so render those as text.
+    nested = ("list", "array", "struct", "map", "union")
+    if any(dtype.id in nested for dtype in relation.types):
+        columns = [
+            f"{quote_identifier(name)}::VARCHAR AS {quote_identifier(name)}"
+            if dtype.id in nested
+            else quote_identifier(name)
+            for name, dtype in zip(relation.columns, relation.types)
+        ]
+        relation = relation.project(", ".join(columns))
+    reader = relation.fetch_arrow_reader()
+    sink = pa.BufferOutputStream()
+    with pa.csv.CSVWriter(sink, reader.schema) as writer:
+        for batch in reader:
+            writer.write_batch(batch)
+    return memoryview(sink.getvalue())
+
+
+def if_none_match(request: Request, etag: str) -> bool:
+    value = request.headers.get("If-None-Match")
+    if value is None:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in value.split(",")]
+    return "*" in tags or etag in tags
+
+
+def link_or_copy(src: str, dst: str):
+    """Hard-link ``src`` to ``dst``, copying it when linking is not possible.
+
+    ``dst`` is replaced if it exists.
+    """
+    with contextlib.suppress(FileNotFoundError):
+        os.unlink(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+def mount_file(
+    app: FastAPI,
+    url: str,
+    media_type: str,
+    write_content: Callable[[str], None],
+    *,
+    executor: concurrent.futures.Executor,
+    directory: str,
+    precompute: bool = True,
 ):
-    @lru_cache(maxsize=1)
-    def get_content() -> bytes:
-        return make_content()
-
-    @app.head(url)
-    async def head(request: Request):
-        content = get_content()
-        bytes_range = parse_range_header(request, len(content))
-        if bytes_range is None:
-            length = len(content)
-        else:
-            length = bytes_range[1] - bytes_range[0]
-        return Response(
-            headers={
-                "Content-Length": str(length),
-                "Content-Type": media_type,
-            }
+    def prepare() -> tuple[str, os.stat_result, str]:
+        fd, path = tempfile.mkstemp(dir=directory)
+        os.close(fd)
+        write_content(path)
+        with open(path, "rb") as f:
+            etag = '"' + hashlib.file_digest(f, "sha1").hexdigest() + '"'
+        return path, os.stat(path), etag
+
+    # With precompute, start writing the file right away on a worker thread, so
+    # that neither the first request nor the event loop has to wait for the
+    # encoding. Otherwise the first request starts it.
+    prepared = executor.submit(prepare) if precompute else None
+
+    # FileResponse handles HEAD and Range requests, and sends the file with
+    # sendfile when the server supports it instead of copying it through Python.
+    @app.api_route(url, methods=["GET", "HEAD"])
+    async def get(request: Request):
+        nonlocal prepared
+        if prepared is None:
+            prepared = executor.submit(prepare)
+        path, stat_result, etag = await asyncio.wrap_future(prepared)
+        # The URL is fixed while the content depends on the dataset being served,
+        # so browsers may cache it but must revalidate, which the ETag makes cheap.
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if if_none_match(request, etag):
+            return Response(status_code=304, headers=headers)
+        return FileResponse(
+            path,
+            media_type=media_type,
+            stat_result=stat_result,
+            headers=headers,
         )
 
-    @app.get(url)
-    async def get(request: Request):
-        content = get_content()
-        bytes_range = parse_range_header(request, len(content))
-        if bytes_range is None:
-            return Response(content=content)
+
+class ViewerStaticFiles(StaticFiles):
+    """Static files for the frontend, with cache headers for the browser.
+
+    The build puts content-hashed files under ``assets/``, which can be cached
+    indefinitely; everything else (e.g., ``index.html``) is revalidated.
+    """
+
+    def file_response(
+        self,
+        full_path: os.PathLike,
+        stat_result: os.stat_result,
+        scope,
+        status_code: int = 200,
+    ) -> Response:
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        relative_path = os.path.relpath(full_path, self.directory or "")
+        if relative_path.startswith("assets" + os.sep):
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
         else:
-            r0, r1 = bytes_range
-            result = content[r0:r1]
-            return Response(
-                content=result,
-                headers={
-                    "Content-Length": str(r1 - r0),
-                    "Content-Range": f"bytes {r0}-{r1 - 1}/{len(content)}",
-                    "Content-Type": media_type,
-                },
-                media_type=media_type,
-                status_code=206,
-            )
+            response.headers["Cache-Control"] = "no-cache"
+        return response
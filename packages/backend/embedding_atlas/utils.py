@@ -1,11 +1,14 @@
 # Copyright (c) 2025 Apple Inc. Licensed under MIT License.
 
 import logging
+from collections.abc import Iterator
+from io import BytesIO
 from pathlib import Path
 from typing import Any
 
 import inquirer
 import narwhals as nw
+import orjson
 import pandas as pd
 import pyarrow as pa
 import pyarrow.parquet as pq
@@ -14,11 +17,30 @@ from narwhals.typing import IntoDataFrame
 logger = logging.getLogger("embedding-atlas")
 
 
+def json_dumps(value: Any, *, sort_keys: bool = False) -> bytes:
+    """Serialize a value to UTF-8 JSON bytes with orjson.
+
+    NumPy scalars and arrays are serialized as numbers and lists, and NaN and
+    infinity as null.
+    """
+    option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+    if sort_keys:
+        option |= orjson.OPT_SORT_KEYS
+    return orjson.dumps(value, option=option)
+
+
+def json_loads(data: bytes | str) -> Any:
+    """Parse JSON from bytes or str with orjson."""
+    return orjson.loads(data)
+
+
 def load_pandas_data(url: str) -> pd.DataFrame:
     suffix = Path(url).suffix.lower()
 
     if suffix == ".parquet":
-        df = pd.read_parquet(url)
+        # Memory-map local files so Arrow reads the pages in place instead of
+        # copying the whole file into its own buffers first.
+        df = pd.read_parquet(url, memory_map=Path(url).is_file())
     elif suffix == ".json" or suffix == ".ndjson":
         df = pd.read_json(url)
     elif suffix == ".jsonl":
@@ -83,10 +105,33 @@ def arrow_to_bytes(arrow: pa.RecordBatchReader):
     return sink.getvalue().to_pybytes()
 
 
-def to_parquet_bytes(df: IntoDataFrame) -> bytes:
+def iter_arrow_ipc(arrow: pa.RecordBatchReader) -> Iterator[bytes]:
+    """Serialize a record batch reader to the Arrow IPC stream format, yielding
+    the encoded bytes batch by batch instead of buffering the whole stream."""
+    sink = BytesIO()
+    with pa.ipc.new_stream(sink, arrow.schema) as writer:
+        for batch in arrow:
+            writer.write_batch(batch)
+            yield sink.getvalue()
+            sink.seek(0)
+            sink.truncate(0)
+    # Schema (for empty results) and end-of-stream marker.
+    yield sink.getvalue()
+
+
+def write_parquet(df: IntoDataFrame, where: Any):
+    """Write a data frame as parquet to a path or writable file-like object.
+
+    Row groups are flushed to ``where`` as they are encoded, so the complete
+    parquet file is never held in memory.
+    """
     arrow_table = nw.from_native(df, eager_only=True).to_arrow()
+    pq.write_table(arrow_table, where)
+
+
+def to_parquet_bytes(df: IntoDataFrame) -> bytes:
     sink = pa.BufferOutputStream()
-    pq.write_table(arrow_table, sink)
+    write_parquet(df, sink)
     return sink.getvalue().to_pybytes()
 
 
@@ -1,6 +1,7 @@
 # Copyright (c) 2025 Apple Inc. Licensed under MIT License.
 
 import numpy as np
+import pyarrow as pa
 import pytest
 from embedding_atlas.cache import (
     async_file_cache_value,
@@ -66,6 +67,23 @@ def test_sha256_hexdigest_nested():
     assert sha256_hexdigest(val) == sha256_hexdigest(val)
 
 
+def test_sha256_hexdigest_arrow_strings():
+    arr = pa.array(["a", "bc", ""], type=pa.large_string())
+    sliced = pa.array(["x", "a", "bc", ""], type=pa.large_string()).slice(1)
+    assert sha256_hexdigest(arr) == sha256_hexdigest(sliced)
+    assert sha256_hexdigest(arr) != sha256_hexdigest(
+        pa.array(["ab", "c", ""], type=pa.large_string())
+    )
+    assert sha256_hexdigest(arr) != sha256_hexdigest(
+        pa.array([b"a", b"bc", b""], type=pa.large_binary())
+    )
+
+
+def test_sha256_hexdigest_numpy_non_contiguous():
+    arr = np.arange(6).reshape(2, 3)[:, :2]
+    assert sha256_hexdigest(arr) == sha256_hexdigest(np.array([[0, 1], [3, 4]]))
+
+
 # ---------------------------------------------------------------------------
 # file_cache_get / file_cache_set / file_cache_value  (integration tests)
 # ---------------------------------------------------------------------------
@@ -91,6 +109,16 @@ def test_file_cache_set_and_get(cache_dir):
     assert result == {"value": 42}
 
 
+def test_file_cache_set_numpy_and_non_finite(cache_dir):
+    value = {"a": np.float32(1.5), "b": np.arange(3), "c": float("nan")}
+    file_cache_set("key", value, cache_root=cache_dir)
+    assert file_cache_get("key", cache_root=cache_dir) == {
+        "a": 1.5,
+        "b": [0, 1, 2],
+        "c": None,
+    }
+
+
 def test_file_cache_set_overwrite(cache_dir):
     file_cache_set("key", "old", cache_root=cache_dir)
     file_cache_set("key", "new", cache_root=cache_dir)
@@ -0,0 +1,210 @@
+# Copyright (c) 2025 Apple Inc. Licensed under MIT License.
+
+"""Unit tests for data source helpers."""
+
+import io
+import json
+import os
+import time
+import zipfile
+
+import embedding_atlas.data_source as data_source_module
+import pandas as pd
+import pytest
+from embedding_atlas.data_source import DataSource, _deep_merge
+
+# ---------------------------------------------------------------------------
+# _deep_merge
+# ---------------------------------------------------------------------------
+
+
+class TestDeepMerge:
+    def test_leaf_override(self):
+        base = {"a": {"b": 1, "c": 2}, "d": 3}
+        result = _deep_merge(base, {"a": {"c": 20}})
+        assert result == {"a": {"b": 1, "c": 20}, "d": 3}
+
+    def test_new_keys(self):
+        result = _deep_merge({"a": {"b": 1}}, {"a": {"x": {"y": 1}}, "z": 2})
+        assert result == {"a": {"b": 1, "x": {"y": 1}}, "z": 2}
+
+    def test_non_dict_replaces_dict(self):
+        assert _deep_merge({"a": {"b": 1}}, {"a": 5}) == {"a": 5}
+        assert _deep_merge({"a": 5}, {"a": {"b": 1}}) == {"a": {"b": 1}}
+
+    def test_base_not_mutated(self):
+        base = {"a": {"b": {"c": 1}}, "d": {"e": 1}}
+        _deep_merge(base, {"a": {"b": {"c": 2, "f": 3}}})
+        assert base == {"a": {"b": {"c": 1}}, "d": {"e": 1}}
+
+    def test_untouched_subtrees_shared(self):
+        base = {"a": {"b": 1}, "d": {"e": 1}}
+        result = _deep_merge(base, {"a": {"b": 2}})
+        assert result["d"] is base["d"]
+        assert result["a"] is not base["a"]
+
+
+# ---------------------------------------------------------------------------
+# DataSource._build_metadata_json
+# ---------------------------------------------------------------------------
+
+
+class TestBuildMetadataJson:
+    def test_rebuilt_when_metadata_replaced(self):
+        source = DataSource("test_metadata_json", pd.DataFrame({"a": [1]}), {"x": 1})
+        overrides = {"props": {"y": 2}}
+        first = source._build_metadata_json(overrides)
+        assert source._build_metadata_json(overrides) is first
+        assert json.loads(first)["x"] == 1
+
+        source.metadata = {"x": 3}
+        assert json.loads(source._build_metadata_json(overrides))["x"] == 3
+
+        source.additional_tables = {"t": pd.DataFrame({"b": [1]})}
+        database = json.loads(source._build_metadata_json(overrides))["database"]
+        assert database["additionalTables"] == [
+            {"name": "t", "url": "tables/t.parquet"}
+        ]
+
+    def test_bounded(self):
+        source = DataSource("test_metadata_json", pd.DataFrame({"a": [1]}), {})
+        first = source._build_metadata_json({"props": {"i": 0}})
+        for i in range(1, 20):
+            source._build_metadata_json({"props": {"i": i}})
+        assert (
+            len(source._metadata_json) == data_source_module._METADATA_JSON_CACHE_SIZE
+        )
+        assert source._build_metadata_json({"props": {"i": 0}}) is not first
+
+
+# ---------------------------------------------------------------------------
+# DataSource.dataset_parquet_path
+# ---------------------------------------------------------------------------
+
+
+class TestDatasetParquet:
+    def test_encoded_once_until_dataset_replaced(self, monkeypatch):
+        calls = []
+        write_parquet = data_source_module.write_parquet
+
+        def counting_write_parquet(df, where):
+            calls.append(df)
+            write_parquet(df, where)
+
+        monkeypatch.setattr(data_source_module, "write_parquet", counting_write_parquet)
+        source = DataSource("test_dataset_parquet", pd.DataFrame({"a": [1, 2]}), {})
+        path = source.dataset_parquet_path()
+        assert source.dataset_parquet_path() == path
+        assert pd.read_parquet(path)["a"].tolist() == [1, 2]
+        assert len(calls) == 1
+
+        source.dataset = pd.DataFrame({"a": [3]})
+        new_path = source.dataset_parquet_path()
+        assert pd.read_parquet(new_path)["a"].tolist() == [3]
+        assert len(calls) == 2
+        assert not os.path.exists(path)
+
+
+# ---------------------------------------------------------------------------
+# DataSource.write_archive
+# ---------------------------------------------------------------------------
+
+
+class _Pipe(io.RawIOBase):
+    """A write-only, non-seekable stream, like a pipe."""
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self.data += b
+        return len(b)
+
+
+class TestWriteArchive:
+    @pytest.fixture(autouse=True)
+    def cache_dir(self, tmp_path, monkeypatch):
+        cache_dir = tmp_path / "cache"
+        monkeypatch.setattr(
+            data_source_module, "user_cache_path", lambda name: cache_dir
+        )
+        return cache_dir / "static_bundles"
+
+    def make_static(self, tmp_path, name):
+        static = tmp_path / name
+        static.mkdir()
+        (static / "index.html").write_text(f"<html>{name}</html>")
+        return str(static)
+
+    def test_non_seekable_output(self, tmp_path):
+        source = DataSource("test_write_archive", pd.DataFrame({"a": [1, 2]}), {})
+        static = self.make_static(tmp_path, "static")
+        pipe = _Pipe()
+        source.write_archive(pipe, static)
+        archive = zipfile.ZipFile(io.BytesIO(bytes(pipe.data)))
+        assert archive.read("index.html") == b"<html>static</html>"
+        assert archive.read("data/metadata.json")
+        assert archive.read("data/dataset.parquet") == (
+            zipfile.ZipFile(io.BytesIO(source.make_archive(static))).read(
+                "data/dataset.parquet"
+            )
+        )
+        assert archive.testzip() is None
+
+    def test_bundle_members_copied_compressed(self, tmp_path, cache_dir):
+        source = DataSource("test_write_archive", pd.DataFrame({"a": [1]}), {})
+        static = self.make_static(tmp_path, "static")
+        data = source.make_archive(static)
+        (bundle_path,) = cache_dir.glob("*.zip")
+        with zipfile.ZipFile(bundle_path) as bundle:
+            members_end = bundle.start_dir
+        assert data.startswith(bundle_path.read_bytes()[:members_end])
+
+    def test_bundle_rebuilt_when_pruned_before_open(self, tmp_path, monkeypatch):
+        source = DataSource("test_write_archive", pd.DataFrame({"a": [1]}), {})
+        static = self.make_static(tmp_path, "static")
+        static_bundle = data_source_module._static_bundle
+        calls = []
+
+        def pruned_static_bundle(static_path, compresslevel):
+            path = static_bundle(static_path, compresslevel)
+            calls.append(path)
+            if len(calls) == 1:
+                path.unlink()
+            return path
+
+        monkeypatch.setattr(data_source_module, "_static_bundle", pruned_static_bundle)
+        archive = zipfile.ZipFile(io.BytesIO(source.make_archive(static)))
+        assert archive.read("index.html") == b"<html>static</html>"
+        assert len(calls) == 2
+
+    def test_stale_bundles_pruned(self, tmp_path, cache_dir):
+        source = DataSource("test_write_archive", pd.DataFrame({"a": [1]}), {})
+        first = self.make_static(tmp_path, "static_0")
+        source.make_archive(first)
+        (first_bundle,) = cache_dir.glob("*.zip")
+        for i in range(1, data_source_module._STATIC_BUNDLE_KEEP + 2):
+            # Using the first bundle again keeps it among the most recent ones.
+            source.make_archive(first)
+            source.make_archive(self.make_static(tmp_path, f"static_{i}"))
+        assert (
+            len(list(cache_dir.glob("*.zip"))) == data_source_module._STATIC_BUNDLE_KEEP
+        )
+        assert first_bundle.exists()
+
+    def test_abandoned_temporary_files_pruned(self, tmp_path, cache_dir):
+        cache_dir.mkdir(parents=True)
+        abandoned = cache_dir / "a.zip.tmp-0"
+        in_progress = cache_dir / "b.zip.tmp-0"
+        abandoned.write_bytes(b"")
+        in_progress.write_bytes(b"")
+        age = data_source_module._STATIC_BUNDLE_TMP_MAX_AGE + 1
+        os.utime(abandoned, (time.time() - age, time.time() - age))
+
+        source = DataSource("test_write_archive", pd.DataFrame({"a": [1]}), {})
+        source.make_archive(self.make_static(tmp_path, "static"))
+        assert not abandoned.exists()
+        assert in_progress.exists()
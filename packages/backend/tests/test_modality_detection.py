@@ -5,6 +5,7 @@
 import narwhals as nw
 import numpy as np
 import pandas as pd
+import pyarrow as pa
 import pytest
 from embedding_atlas.projection import (
     _detect_binary_modality,
@@ -248,10 +249,9 @@ class TestToCanonicalVector:
     def test_ndarray_input(self):
         arr = np.array([1.0, 2.0, 3.0], dtype=np.float64)
         result = _to_canonical_vector(_nw_series([arr]))
-        assert type(result) is list
-        assert len(result) == 1
-        assert isinstance(result[0], np.ndarray)
-        assert result[0].dtype == np.float32
+        assert isinstance(result, np.ndarray)
+        assert result.shape == (1, 3)
+        assert result.dtype == np.float32
         np.testing.assert_array_almost_equal(result[0], [1.0, 2.0, 3.0])
 
     def test_list_input(self):
@@ -264,7 +264,20 @@ class TestToCanonicalVector:
     def test_mixed_ndarray_and_list(self):
         items = [np.array([1.0, 2.0]), [3.0, 4.0]]
         result = _to_canonical_vector(_nw_series(items))
-        assert type(result) is list
-        assert len(result) == 2
-        assert all(isinstance(r, np.ndarray) for r in result)
-        assert all(r.dtype == np.float32 for r in result)
+        assert isinstance(result, np.ndarray)
+        assert result.shape == (2, 2)
+        assert result.dtype == np.float32
+
+    def test_arrow_list_input(self):
+        series = pd.Series(
+            [[1.0, 2.0], [3.0, 4.0], [5.0, 6.0]],
+            dtype=pd.ArrowDtype(pa.list_(pa.float64())),
+        )
+        result = _to_canonical_vector(nw.from_native(series, series_only=True))
+        assert result.shape == (3, 2)
+        assert result.dtype == np.float32
+        np.testing.assert_array_almost_equal(result, [[1, 2], [3, 4], [5, 6]])
+
+    def test_ragged_raises(self):
+        with pytest.raises(ValueError, match="same length"):
+            _to_canonical_vector(_nw_series([[1.0, 2.0], [3.0]]))
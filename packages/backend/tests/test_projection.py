@@ -2,15 +2,18 @@
 
 """Tests for compute_projection using a placeholder embedder (no real models)."""
 
+import asyncio
 import io
 import shutil
+import types
 
 import numpy as np
 import pandas as pd
 import polars as pl
 import pytest
+from embedding_atlas import projection
 from embedding_atlas.embedding import create_embedder
-from embedding_atlas.projection import compute_projection
+from embedding_atlas.projection import Projection, compute_projection
 from PIL import Image
 
 NUM_SAMPLES = 30
@@ -326,6 +329,41 @@ def test_unknown_embedder_name(text_df, cache_root):
         )
 
 
+def test_unknown_umap_backend(text_df, cache_root):
+    with pytest.raises(ValueError, match="Unknown UMAP backend"):
+        compute_projection(
+            text_df,
+            inputs="text",
+            modality="text",
+            embedder=_fake_embedder,
+            umap_backend="nonexistent",
+            cache_root=cache_root,
+        )
+
+
+def test_auto_umap_backend_falls_back_to_umap_learn(text_df, cache_root, monkeypatch):
+    monkeypatch.setattr(projection, "_cuml_available", lambda: False)
+    expected = compute_projection(
+        text_df,
+        inputs="text",
+        modality="text",
+        embedder=_fake_embedder,
+        umap_args={"random_state": 42},
+        cache_root=cache_root,
+    )
+    result = compute_projection(
+        text_df,
+        inputs="text",
+        modality="text",
+        embedder=_fake_embedder,
+        umap_args={"random_state": 42},
+        umap_backend="auto",
+        cache_root=cache_root,
+    )
+    np.testing.assert_array_equal(result["projection_x"], expected["projection_x"])
+    np.testing.assert_array_equal(result["projection_y"], expected["projection_y"])
+
+
 def test_sentence_transformers_rejects_image():
     with pytest.raises(NotImplementedError, match="only supports text"):
         create_embedder(
@@ -333,6 +371,38 @@ def test_sentence_transformers_rejects_image():
         )
 
 
+def test_litellm_image_requests_bounded(monkeypatch):
+    litellm = pytest.importorskip("litellm")
+    in_flight = []
+    peak = []
+
+    async def fake_aembedding(input, model, **kwargs):
+        in_flight.append(None)
+        peak.append(len(in_flight))
+        await asyncio.sleep(0.01)
+        in_flight.pop()
+        return types.SimpleNamespace(data=[{"embedding": [0.0, 1.0]}])
+
+    monkeypatch.setattr(litellm, "aembedding", fake_aembedding)
+    embed = create_embedder(
+        "litellm",
+        modality="image",
+        model="fake",
+        embedder_args={},
+        max_concurrency=3,
+    )
+
+    async def run():
+        batch = [{"bytes": b"x"}] * 10
+        return await asyncio.gather(
+            *(embed(batch, model="fake", embedder_args={}) for _ in range(2))
+        )
+
+    results = asyncio.run(run())
+    assert [r.shape for r in results] == [(10, 2), (10, 2)]
+    assert max(peak) == 3
+
+
 def test_underscore_embedder_name(text_df, cache_root):
     """Test that 'sentence_transformers' (underscore) is accepted and normalized.
 
@@ -397,3 +467,44 @@ def test_vector_polars(vector_pl, cache_root):
     assert isinstance(result, pl.DataFrame)
     assert "projection_x" in result.columns
     assert len(result) == NUM_SAMPLES
+
+
+# ---------------------------------------------------------------------------
+# Projection serialization
+# ---------------------------------------------------------------------------
+
+
+def _make_projection() -> Projection:
+    rng = np.random.RandomState(0)
+    return Projection(
+        projection=rng.randn(NUM_SAMPLES, 2).astype(np.float32),
+        knn_indices=rng.randint(0, NUM_SAMPLES, (NUM_SAMPLES, 15)),
+        knn_distances=rng.rand(NUM_SAMPLES, 15).astype(np.float32),
+    )
+
+
+def _assert_projection_equal(a: Projection, b: Projection):
+    for name in ("projection", "knn_indices", "knn_distances"):
+        assert getattr(a, name).dtype == getattr(b, name).dtype
+        np.testing.assert_array_equal(getattr(a, name), getattr(b, name))
+
+
+def test_projection_serialize_roundtrip():
+    proj = _make_projection()
+    buf = io.BytesIO()
+    Projection.serialize(proj, buf)
+    buf.seek(0)
+    _assert_projection_equal(proj, Projection.deserialize(buf))
+
+
+def test_projection_deserialize_legacy_npz():
+    proj = _make_projection()
+    buf = io.BytesIO()
+    np.savez(
+        buf,
+        projection=proj.projection,
+        knn_indices=proj.knn_indices,
+        knn_distances=proj.knn_distances,
+    )
+    buf.seek(0)
+    _assert_projection_equal(proj, Projection.deserialize(buf))
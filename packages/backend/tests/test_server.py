@@ -0,0 +1,454 @@
+# Copyright (c) 2025 Apple Inc. Licensed under MIT License.
+
+"""Tests for the HTTP server."""
+
+import concurrent.futures
+import csv
+import io
+import json
+import os
+import uuid
+import zipfile
+
+import embedding_atlas.cache as cache_module
+import embedding_atlas.data_source as data_source_module
+import embedding_atlas.server as server_module
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from embedding_atlas.data_source import DataSource
+from embedding_atlas.server import ResponseCache, make_server
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture(autouse=True)
+def user_cache(tmp_path_factory, monkeypatch):
+    """Keep the entries written by data sources out of the user's cache."""
+    root = tmp_path_factory.mktemp("user_cache")
+    monkeypatch.setattr(cache_module, "user_cache_path", lambda name: root)
+    cache_module._get_constants.cache_clear()
+    yield root
+    cache_module._get_constants.cache_clear()
+
+
+@pytest.fixture()
+def client(tmp_path):
+    df = pd.DataFrame({"id": range(100), "text": [f"row {i}" for i in range(100)]})
+    data_source = DataSource("test_server", df, {})
+    app = make_server(data_source, static_path=str(tmp_path))
+    with TestClient(app) as client:
+        yield client
+
+
+# ---------------------------------------------------------------------------
+# /data/dataset.parquet
+# ---------------------------------------------------------------------------
+
+
+def test_dataset_parquet(client):
+    response = client.get("/data/dataset.parquet")
+    assert response.status_code == 200
+    assert len(pd.read_parquet(io.BytesIO(response.content))) == 100
+
+
+def test_dataset_parquet_etag(client):
+    etag = client.get("/data/dataset.parquet").headers["ETag"]
+    assert client.head("/data/dataset.parquet").headers["ETag"] == etag
+
+    response = client.get("/data/dataset.parquet", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+    response = client.get("/data/dataset.parquet", headers={"If-None-Match": '"x"'})
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"] == "no-cache"
+
+
+def test_dataset_parquet_range(client):
+    content = client.get("/data/dataset.parquet").content
+    response = client.get("/data/dataset.parquet", headers={"Range": "bytes=4-11"})
+    assert response.status_code == 206
+    assert response.content == content[4:12]
+    assert response.headers["Content-Range"] == f"bytes 4-11/{len(content)}"
+
+    response = client.get("/data/dataset.parquet", headers={"Range": "bytes=-8"})
+    assert response.status_code == 206
+    assert response.content == content[-8:]
+
+    response = client.head("/data/dataset.parquet")
+    assert response.headers["Content-Length"] == str(len(content))
+
+
+def test_dataset_parquet_lazy_in_server_mode(tmp_path, monkeypatch):
+    df = pd.DataFrame({"id": range(3)})
+    data_source = DataSource("test_server", df, {})
+    calls = []
+    dataset_parquet_path = data_source.dataset_parquet_path
+
+    def counting_dataset_parquet_path():
+        calls.append(None)
+        return dataset_parquet_path()
+
+    monkeypatch.setattr(
+        data_source, "dataset_parquet_path", counting_dataset_parquet_path
+    )
+    app = make_server(data_source, static_path=str(tmp_path), duckdb_uri="server")
+    with TestClient(app) as client:
+        client.get("/data/metadata.json")
+        assert calls == []
+        response = client.get("/data/dataset.parquet")
+        assert len(pd.read_parquet(io.BytesIO(response.content))) == 3
+        assert len(calls) == 1
+        # The served file is a link to the data source's file, not a copy.
+        assert os.stat(dataset_parquet_path()).st_nlink == 2
+
+
+# ---------------------------------------------------------------------------
+# Static files
+# ---------------------------------------------------------------------------
+
+
+def test_static_cache_control(client, tmp_path):
+    (tmp_path / "index.html").write_text("<html></html>")
+    (tmp_path / "assets").mkdir()
+    (tmp_path / "assets" / "index-abc123.js").write_text("")
+
+    response = client.get("/")
+    assert response.headers["Cache-Control"] == "no-cache"
+    response = client.get("/assets/index-abc123.js")
+    assert response.headers["Cache-Control"] == "public, max-age=31536000, immutable"
+
+
+# ---------------------------------------------------------------------------
+# /data/query
+# ---------------------------------------------------------------------------
+
+
+@pytest.fixture()
+def server_client(tmp_path):
+    df = pd.DataFrame({"id": range(100), "text": [f"row {i}" for i in range(100)]})
+    data_source = DataSource("test_server", df, {})
+    app = make_server(data_source, static_path=str(tmp_path), duckdb_uri="server")
+    with TestClient(app) as client:
+        yield client
+
+
+def test_query_arrow(server_client):
+    response = server_client.post(
+        "/data/query",
+        json={"type": "arrow", "sql": "SELECT id FROM dataset WHERE id < 10"},
+    )
+    assert response.status_code == 200
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.column("id").to_pylist() == list(range(10))
+
+
+def test_query_arrow_single_batch(server_client):
+    # DuckDB fills each record batch up to ARROW_BATCH_SIZE rows, so the stream
+    # is not fragmented into per-vector batches.
+    response = server_client.post(
+        "/data/query",
+        json={"type": "arrow", "sql": "SELECT * FROM range(100000) t(i)"},
+    )
+    batches = list(pa.ipc.open_stream(response.content))
+    assert [batch.num_rows for batch in batches] == [100000]
+
+
+def test_query_arrow_empty(server_client):
+    response = server_client.post(
+        "/data/query",
+        json={"type": "arrow", "sql": "SELECT id FROM dataset WHERE id < 0"},
+    )
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.num_rows == 0
+    assert table.schema.names == ["id"]
+
+
+def test_query_arrow_errors(server_client, monkeypatch):
+    def query(sql):
+        return server_client.post("/data/query", json={"type": "arrow", "sql": sql})
+
+    # Errors while producing the first batch still get an error status.
+    response = query("SELECT error('boom') FROM range(10)")
+    assert response.status_code == 500
+    assert "boom" in response.json()["error"]
+
+    # Later errors abort the response instead of truncating it.
+    iter_arrow_ipc = server_module.iter_arrow_ipc
+
+    def failing_iter_arrow_ipc(reader):
+        yield next(iter_arrow_ipc(reader))
+        raise RuntimeError("late")
+
+    monkeypatch.setattr(server_module, "iter_arrow_ipc", failing_iter_arrow_ipc)
+    with pytest.raises(RuntimeError, match="late"):
+        query("SELECT * FROM range(10)")
+
+
+def test_query_json(server_client):
+    response = server_client.post(
+        "/data/query",
+        json={"type": "json", "sql": "SELECT id, text FROM dataset WHERE id < 2"},
+    )
+    assert response.json() == [{"id": 0, "text": "row 0"}, {"id": 1, "text": "row 1"}]
+
+
+def test_query_json_non_finite_floats(server_client):
+    # NaN and Infinity are not valid JSON, so they are sent as null.
+    response = server_client.post(
+        "/data/query",
+        json={
+            "type": "json",
+            "sql": "SELECT 'nan'::DOUBLE AS a, 'inf'::FLOAT AS b, "
+            "['-inf'::DOUBLE, 1.5] AS c, {'d': 'nan'::DOUBLE, 'e': 2} AS f",
+        },
+    )
+    assert json.loads(response.content) == [
+        {"a": None, "b": None, "c": [None, 1.5], "f": {"d": None, "e": 2}}
+    ]
+
+
+def test_query_json_temporal(server_client):
+    response = server_client.post(
+        "/data/query",
+        json={
+            "type": "json",
+            "sql": "SELECT TIMESTAMP '2024-01-02 03:04:05' AS t, DATE '2024-01-02' AS d",
+        },
+    )
+    assert response.json() == [{"t": "2024-01-02 03:04:05", "d": "2024-01-02"}]
+
+
+def test_query_error(server_client):
+    response = server_client.post(
+        "/data/query", json={"type": "arrow", "sql": "SELECT * FROM missing"}
+    )
+    assert response.status_code == 500
+    assert "error" in response.json()
+
+
+def test_query_json_empty(server_client):
+    response = server_client.post(
+        "/data/query",
+        json={"type": "json", "sql": "SELECT id FROM dataset WHERE id < 0"},
+    )
+    assert response.json() == []
+
+
+def test_query_cache_invalidated_by_exec(server_client):
+    def query(type, sql):
+        response = server_client.post("/data/query", json={"type": type, "sql": sql})
+        assert response.status_code == 200
+        return response
+
+    def count(type):
+        response = query(type, "SELECT count(*) AS n FROM items")
+        if type == "json":
+            return response.json()[0]["n"]
+        return pa.ipc.open_stream(response.content).read_all()["n"][0].as_py()
+
+    query("exec", "CREATE TABLE items AS SELECT 1 AS x")
+    for _ in range(2):
+        assert count("arrow") == 1
+        assert count("json") == 1
+
+    query("exec", "INSERT INTO items VALUES (2)")
+    assert count("arrow") == 2
+    assert count("json") == 2
+
+
+def test_query_session_state_not_shared(server_client):
+    def query(type, sql):
+        return server_client.post("/data/query", json={"type": type, "sql": sql})
+
+    # Temporary objects live only as long as the request that creates them.
+    assert query("exec", "CREATE TEMP TABLE scratch AS SELECT 1 AS x").json() == {}
+    assert query("json", "SELECT * FROM scratch").status_code == 500
+
+    response = query("json", "SET VARIABLE answer = 42")
+    assert response.status_code == 500
+    assert response.json() == {"error": "statement must return rows"}
+    for _ in range(4):
+        response = query("json", "SELECT getvariable('answer') AS v")
+        assert response.json() == [{"v": None}]
+
+
+# ---------------------------------------------------------------------------
+# /data/selection
+# ---------------------------------------------------------------------------
+
+
+def test_selection_formats(server_client):
+    def select(format):
+        response = server_client.post(
+            "/data/selection", json={"predicate": "id >= 97", "format": format}
+        )
+        assert response.status_code == 200
+        return response.content
+
+    table = pq.read_table(io.BytesIO(select("parquet")))
+    assert table.column("id").to_pylist() == [97, 98, 99]
+    assert json.loads(select("json")) == [
+        {"id": i, "text": f"row {i}"} for i in (97, 98, 99)
+    ]
+    assert select("jsonl").splitlines() == [
+        f'{{"id":{i},"text":"row {i}"}}'.encode() for i in (97, 98, 99)
+    ]
+    rows = list(csv.reader(select("csv").decode().splitlines()))
+    assert rows == [
+        ["id", "text"],
+        ["97", "row 97"],
+        ["98", "row 98"],
+        ["99", "row 99"],
+    ]
+
+
+def test_selection_nested_and_non_finite(tmp_path):
+    df = pd.DataFrame(
+        {
+            "id": range(2),
+            "score": [0.5, float("inf")],
+            "neighbors": [{"ids": [1], "distances": [0.5]}] * 2,
+        }
+    )
+    data_source = DataSource("test_server_nested", df, {})
+    app = make_server(data_source, static_path=str(tmp_path), duckdb_uri="server")
+    with TestClient(app) as client:
+
+        def select(format):
+            response = client.post(
+                "/data/selection", json={"predicate": None, "format": format}
+            )
+            assert response.status_code == 200
+            return response.content
+
+        expected = [
+            {"id": 0, "score": 0.5, "neighbors": {"ids": [1], "distances": [0.5]}},
+            {"id": 1, "score": None, "neighbors": {"ids": [1], "distances": [0.5]}},
+        ]
+        assert json.loads(select("json")) == expected
+        assert [json.loads(line) for line in select("jsonl").splitlines()] == expected
+        rows = list(csv.reader(select("csv").decode().splitlines()))
+        assert rows == [
+            ["id", "score", "neighbors"],
+            ["0", "0.5", "{'ids': [1], 'distances': [0.5]}"],
+            ["1", "inf", "{'ids': [1], 'distances': [0.5]}"],
+        ]
+
+
+def test_selection_rejects_statements(server_client):
+    response = server_client.post(
+        "/data/selection",
+        json={"predicate": "true; DROP TABLE dataset", "format": "json"},
+    )
+    assert response.status_code == 500
+    response = server_client.post(
+        "/data/selection", json={"predicate": None, "format": "json"}
+    )
+    assert len(response.json()) == 100
+
+
+def test_selection_empty_json(server_client):
+    response = server_client.post(
+        "/data/selection", json={"predicate": "id < 0", "format": "json"}
+    )
+    assert response.json() == []
+
+
+# ---------------------------------------------------------------------------
+# /data/cache
+# ---------------------------------------------------------------------------
+
+
+def test_cache_roundtrip(client):
+    name = f"test_{uuid.uuid4().hex}"
+    assert client.get(f"/data/cache/{name}").status_code == 404
+    value = {"label": "é", "items": [1, 2.5, None]}
+    client.post(f"/data/cache/{name}", json=value)
+    response = client.get(f"/data/cache/{name}")
+    assert response.headers["Content-Type"] == "application/json"
+    assert response.json() == value
+
+
+# ---------------------------------------------------------------------------
+# MCP proxy
+# ---------------------------------------------------------------------------
+
+
+def test_mcp_proxy_roundtrip(tmp_path):
+    df = pd.DataFrame({"id": range(3)})
+    app = make_server(
+        DataSource("test_server", df, {}), static_path=str(tmp_path), mcp=True
+    )
+    with (
+        TestClient(app) as client,
+        client.websocket_connect("/data/mcp_websocket") as ws,
+        concurrent.futures.ThreadPoolExecutor(2) as executor,
+    ):
+        responses = [
+            executor.submit(client.post, "/mcp", json={"method": f"m{i}"})
+            for i in range(2)
+        ]
+        # Echo each request back as its response, once as a text frame and once
+        # as a binary frame.
+        for binary in (False, True):
+            message = json.loads(ws.receive_text())
+            reply = json.dumps({"id": message["id"], "response": message["request"]})
+            if binary:
+                ws.send_bytes(reply.encode())
+            else:
+                ws.send_text(reply)
+        assert [r.result().json() for r in responses] == [
+            {"method": "m0"},
+            {"method": "m1"},
+        ]
+
+
+# ---------------------------------------------------------------------------
+# ResponseCache
+# ---------------------------------------------------------------------------
+
+
+def test_response_cache_evicts_least_recently_used():
+    cache = ResponseCache(10)
+    cache.put(b"a", b"1234", cache.generation)
+    cache.put(b"b", b"1234", cache.generation)
+    assert cache.get(b"a") == b"1234"
+    cache.put(b"c", b"1234", cache.generation)
+    assert cache.get(b"b") is None
+    assert cache.get(b"a") == b"1234"
+    assert cache.get(b"c") == b"1234"
+    assert cache.size == 8
+
+
+def test_response_cache_skips_oversized_and_stale():
+    cache = ResponseCache(10)
+    cache.put(b"a", b"x" * 11, cache.generation)
+    assert cache.get(b"a") is None
+
+    generation = cache.generation
+    cache.clear()
+    cache.put(b"b", b"1", generation)
+    assert cache.get(b"b") is None
+
+
+# ---------------------------------------------------------------------------
+# /data/archive.zip
+# ---------------------------------------------------------------------------
+
+
+def test_archive_rebuilt_after_cache_write(client, user_cache, monkeypatch):
+    # Static bundles are built under the user cache directory as well.
+    monkeypatch.setattr(data_source_module, "user_cache_path", lambda name: user_cache)
+    first = client.get("/data/archive.zip").content
+    assert client.get("/data/archive.zip").content == first
+    assert len(list((user_cache / "static_bundles").glob("*.zip"))) == 1
+
+    name = f"test_{uuid.uuid4().hex}"
+    client.post(f"/data/cache/{name}", json={"value": 1})
+    archive = zipfile.ZipFile(io.BytesIO(client.get("/data/archive.zip").content))
+    assert [n for n in archive.namelist() if n.startswith("data/cache/")] == [
+        f"data/cache/{name}"
+    ]
+    assert json.loads(archive.read(f"data/cache/{name}")) == {"value": 1}
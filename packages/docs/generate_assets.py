@@ -3,6 +3,7 @@ Generate assets by copying viewer dist and modifying HTML files.
 """
 
 import hashlib
+import os
 import shutil
 import sys
 from pathlib import Path
@@ -11,8 +12,7 @@ from textwrap import dedent, indent
 
 def insert_script(html_file_path: Path, snippet: str):
     if html_file_path.exists():
-        with open(html_file_path, "r", encoding="utf-8") as f:
-            content = f.read()
+        content = html_file_path.read_bytes()
 
         snippet = (
             '<script type="module">\n'
@@ -20,21 +20,37 @@ def insert_script(html_file_path: Path, snippet: str):
             + "\n</script>"
         )
 
-        modified_content = content.replace(
-            "</style>",
-            "</style>\n" + indent(snippet, "    "),
-            1,
+        # Splice the script in right after the first </style>.
+        tag = b"</style>"
+        position = content.find(tag)
+        if position < 0:
+            return
+        position += len(tag)
+        # The file may be hard-linked to the viewer dist, so replace it rather
+        # than writing through the link.
+        html_file_path.unlink()
+        html_file_path.write_bytes(
+            content[:position]
+            + ("\n" + indent(snippet, "    ")).encode("utf-8")
+            + content[position:]
         )
 
-        with open(html_file_path, "w", encoding="utf-8") as f:
-            f.write(modified_content)
+
+def copy_tree_linked(src: Path, dst: Path):
+    """Copy a directory tree, hard-linking the files when the filesystem allows it."""
+
+    def link_or_copy(src: str, dst: str):
+        try:
+            os.link(src, dst)
+        except OSError:
+            shutil.copy2(src, dst)
+
+    shutil.copytree(src, dst, copy_function=link_or_copy)
 
 
 def file_hash(path: Path):
-    hasher = hashlib.sha1()
     with open(path, "rb") as f:
-        hasher.update(f.read())
-    return hasher.hexdigest()
+        return hashlib.file_digest(f, "sha1").hexdigest()
 
 
 def main():
@@ -59,7 +75,7 @@ def main():
         shutil.rmtree(app_dir)
 
     # Copy viewer dist to public/app
-    shutil.copytree(viewer_dist, app_dir)
+    copy_tree_linked(viewer_dist, app_dir)
 
     # Modify the index.html file
     insert_script(
@@ -82,7 +98,7 @@ def main():
     examples_dir.mkdir(parents=True, exist_ok=True)
 
     # Copy viewer dist to public/examples/app
-    shutil.copytree(viewer_dist, examples_app_dir)
+    copy_tree_linked(viewer_dist, examples_app_dir)
 
     # Copy datasets.js to assets folder (with a random hash suffix)
     datasets_js = f"datasets-{file_hash(script_dir / 'examples/datasets.js')[:8]}.js"
@@ -99,8 +115,12 @@ def main():
     )
 
     if (script_dir / ".cache").exists():
+        # Skip the download and manifest caches kept by generate_cache.py.
         shutil.copytree(
-            script_dir / ".cache", examples_dir / "cache", dirs_exist_ok=True
+            script_dir / ".cache",
+            examples_dir / "cache",
+            ignore=shutil.ignore_patterns(".*"),
+            dirs_exist_ok=True,
         )
 
     print("Asset generation completed successfully!")
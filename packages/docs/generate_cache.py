@@ -1,24 +1,147 @@
+import functools
 import hashlib
+import inspect
 import json
 import logging
+import multiprocessing
+import os
 import re
-from io import BytesIO
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 
 import click
 import duckdb
-import pandas as pd
+import numpy as np
+import pyarrow as pa
 import requests
 from embedding_atlas.pagerank import compute_pagerank_column
 from embedding_atlas.projection import compute_projection
+from embedding_atlas.utils import json_loads
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
 
+# Find all special comments with generate_dataset_embedding calls
+# Pattern matches: /*! ... generate_dataset_embedding({ ... }) ... */
+GENERATE_CALL_PATTERN = re.compile(
+    r"/\*!\s*.*?generate_dataset_embedding\s*\(\s*(\{.*?\})\s*\).*?\*/", re.DOTALL
+)
+TRAILING_COMMA_PATTERN = re.compile(r",(\s*[}\]])")
 
-def load_and_check_integrity(url: str, *, sha256: str) -> bytes:
-    resp = requests.get(url)
-    data = resp.content
-    assert isinstance(data, bytes)
-    assert hashlib.sha256(data).hexdigest() == sha256, "checksum mismatch"
-    return data
+
+def make_session() -> requests.Session:
+    # One session per process, so downloads from the same host reuse pooled
+    # connections; transient gateway errors are retried with backoff.
+    retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[502, 503, 504])
+    adapter = HTTPAdapter(pool_connections=8, pool_maxsize=8, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+SESSION = make_session()
+
+
+def load_and_check_integrity(url: str, *, sha256: str, cache_dir: Path) -> Path:
+    # Downloads are kept in cache_dir under their checksum, so a dataset is only
+    # fetched once even when its query or projection parameters change. Files
+    # are only renamed into place after their checksum was verified, so cached
+    # files are trusted as-is.
+    path = cache_dir / f"{sha256}.bin"
+    if path.exists():
+        return path
+
+    # Hash the download as it arrives instead of holding the whole response in
+    # memory, and only move it into place once the checksum matches.
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    hasher = hashlib.sha256()
+    with tempfile.NamedTemporaryFile(dir=cache_dir, delete=False) as file:
+        try:
+            with SESSION.get(url, stream=True, timeout=(10, 300)) as resp:
+                resp.raise_for_status()
+                for chunk in resp.iter_content(chunk_size=1 << 20):
+                    hasher.update(chunk)
+                    file.write(chunk)
+            actual = hasher.hexdigest()
+            if actual != sha256:
+                raise ValueError(f"checksum mismatch: got {actual}, want {sha256}")
+        except BaseException:
+            os.unlink(file.name)
+            raise
+    os.replace(file.name, path)
+    return path
+
+
+def output_stat(path: Path) -> list[int]:
+    stat = path.stat()
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def write_atomic(path: Path, data: bytes):
+    with tempfile.NamedTemporaryFile(dir=path.parent, delete=False) as file:
+        file.write(data)
+    os.replace(file.name, path)
+
+
+@functools.cache
+def load_sentence_transformer(model: str, half: bool):
+    # Loaded once per worker process and shared by all the datasets it handles.
+    from sentence_transformers import SentenceTransformer
+
+    st_model = SentenceTransformer(model)
+    if half:
+        st_model.half()
+    return st_model
+
+
+async def embed_text(
+    batch: list[str], *, model: str | None, embedder_args: dict
+) -> np.ndarray:
+    st_model = load_sentence_transformer(model or "all-MiniLM-L6-v2", **embedder_args)
+    return st_model.encode(batch, show_progress_bar=False, batch_size=len(batch))
+
+
+def text_embedder_args() -> dict:
+    # On GPUs, run the model in half precision: it halves the memory traffic and
+    # runs on the tensor cores. CPUs keep float32.
+    import torch
+
+    return {"half": torch.cuda.is_available()}
+
+
+def dataset_manifest(task: dict) -> tuple[dict, Path, Path]:
+    # The parameters recorded in the manifest of a generate_dataset_embedding call
+    # (with the defaults filled in), along with the manifest and output paths.
+    arguments = inspect.signature(generate_dataset_embedding).bind(**task)
+    arguments.apply_defaults()
+    args = arguments.arguments
+    params = {
+        "sha256": args["sha256"],
+        "query": args["query"],
+        "output": args["output"],
+        "inputs": args["inputs"],
+        "modality": args["modality"],
+        "model": args["model"],
+        "pagerank": args["pagerank"],
+        "umap_args": {"random_state": 42, **(args["umap_args"] or {})},
+        "umap_backend": args["umap_backend"],
+    }
+    key = hashlib.blake2b(
+        json.dumps(params, sort_keys=True).encode(), digest_size=16
+    ).hexdigest()
+    output_folder = Path(args["output_folder"])
+    manifest_path = output_folder / ".manifest" / f"{key}.json"
+    return params, manifest_path, output_folder / args["output"]
+
+
+def is_up_to_date(manifest_path: Path, output_path: Path) -> bool:
+    # The manifest records the output's size and mtime, so it no longer matches
+    # once the output is overwritten by a run with different parameters.
+    if not (manifest_path.exists() and output_path.exists()):
+        return False
+    manifest = json_loads(manifest_path.read_bytes())
+    return manifest.get("stat") == output_stat(output_path)
 
 
 def generate_dataset_embedding(
@@ -32,78 +155,179 @@ def generate_dataset_embedding(
     modality: str = "text",
     model: str | None = "all-MiniLM-L6-v2",
     pagerank: bool = False,
-    umap_args: dict = {},
+    umap_args: dict | None = None,
+    umap_backend: str = "auto",
 ):
+    params, manifest_path, output_path = dataset_manifest(locals())
+    umap_args = params["umap_args"]
+
     click.echo(click.style(f"Processing {url}", fg="cyan"))
+    if is_up_to_date(manifest_path, output_path):
+        click.echo(f"Cache hit, {output} is up to date")
+        return
 
-    binary_data = load_and_check_integrity(url, sha256=sha256)
-    if url.endswith(".parquet"):
-        data_frame = pd.read_parquet(BytesIO(binary_data))
-    elif url.endswith(".jsonl"):
-        data_frame = pd.read_json(BytesIO(binary_data), lines=True, orient="records")
-    elif url.endswith(".csv"):
-        data_frame = pd.read_csv(BytesIO(binary_data))
-    else:
-        raise ValueError("invalid data format")
-    _ = data_frame
-    df = duckdb.query(query).to_df()
+    downloads = Path(output_folder) / ".downloads"
+    path = str(load_and_check_integrity(url, sha256=sha256, cache_dir=downloads))
 
-    umap_args = {"random_state": 42} | umap_args
+    # Expose the downloaded file to the query as a view named data_frame, so
+    # DuckDB scans it directly and only materializes the query's result.
+    with duckdb.connect() as connection:
+        if url.endswith(".parquet"):
+            source = connection.read_parquet(path)
+        elif url.endswith(".jsonl"):
+            source = connection.read_json(path, format="newline_delimited")
+        elif url.endswith(".csv"):
+            source = connection.read_csv(path)
+        else:
+            raise ValueError("invalid data format")
+        source.create_view("data_frame")
+        # Keep the result in Arrow form: compute_projection reads the inputs
+        # straight from the Arrow buffers, so strings never become Python objects
+        # in a pandas column.
+        table = connection.sql(query).to_arrow_table()
+
+    if modality == "text":
+        embedder, batch_size, embedder_args = embed_text, 256, text_embedder_args()
+    else:
+        embedder, batch_size, embedder_args = None, None, {}
 
-    df = compute_projection(
-        df,
+    # Only hand the inputs column to compute_projection, and release it (it is
+    # not part of the output) as soon as the projection is done.
+    inputs_frame = table.select([inputs])
+    table = table.drop_columns([inputs])
+    projection = compute_projection(
+        inputs_frame,
         inputs=inputs,
         modality=modality,
         x="x",
         y="y",
         neighbors="neighbors",
+        embedder=embedder,
         model=model,
+        batch_size=batch_size,
+        max_concurrency=1,
+        embedder_args=embedder_args,
         umap_args=umap_args,
+        umap_backend=umap_backend,
     )
+    del inputs_frame
+    # The coordinates don't need double precision.
+    table = table.append_column("x", projection["x"].cast(pa.float32()))
+    table = table.append_column("y", projection["y"].cast(pa.float32()))
+    table = table.append_column("neighbors", projection["neighbors"])
+    del projection
 
     if pagerank:
-        df["pagerank"] = compute_pagerank_column(df, neighbors="neighbors")
-
-    df = df.drop(columns=inputs)
+        neighbors_frame = table.select(["neighbors"]).to_pandas()
+        scores = compute_pagerank_column(neighbors_frame, neighbors="neighbors")
+        table = table.append_column("pagerank", pa.array(scores))
 
     Path(output_folder).mkdir(exist_ok=True, parents=True)
-    df.to_parquet(Path(output_folder) / output)
+    # Let DuckDB's parallel parquet writer encode the output. Zstd keeps the
+    # files served by the docs site small, and row groups of 100k rows keep
+    # them decodable in chunks.
+    with duckdb.connect() as connection:
+        connection.register("output", table)
+        connection.execute(
+            """
+            COPY output TO $1 (
+                FORMAT parquet,
+                COMPRESSION zstd,
+                COMPRESSION_LEVEL 9,
+                ROW_GROUP_SIZE 100000
+            )
+            """,
+            [str(output_path)],
+        )
+
+    manifest_path.parent.mkdir(exist_ok=True)
+    manifest = {"params": params, "stat": output_stat(output_path)}
+    write_atomic(manifest_path, json.dumps(manifest, indent=2).encode())
 
     click.echo(f"Results written to {output}")
 
 
-@click.command()
-@click.option("--output-folder", default=".cache", help="Output folder")
-def main(output_folder: str):
+def setup_logging():
     logging.basicConfig(
         level=logging.INFO,
         format="%(levelname)s: (%(name)s) %(message)s",
     )
 
+
+def run_task(params: dict):
+    generate_dataset_embedding(**params)
+
+
+@click.command()
+@click.option("--output-folder", default=".cache", help="Output folder")
+def main(output_folder: str):
+    setup_logging()
+
     # Path to the datasets.js file
     datasets_file = Path(__file__).parent / "examples" / "datasets.js"
 
     # Read the datasets.js file
     content = datasets_file.read_text(encoding="utf-8")
 
-    # Find all special comments with generate_dataset_embedding calls
-    # Pattern matches: /*! ... generate_dataset_embedding({ ... }) ... */
-    pattern = r"/\*!\s*.*?generate_dataset_embedding\s*\(\s*(\{.*?\})\s*\).*?\*/"
-    matches = re.findall(pattern, content, re.DOTALL)
+    tasks = []
+    for match in GENERATE_CALL_PATTERN.finditer(content):
+        # Remove trailing commas, then parse the JSON parameters
+        json_str = TRAILING_COMMA_PATTERN.sub(r"\1", match.group(1))
+        params = json_loads(json_str)
+
+        task = params | {"output_folder": output_folder}
+
+        # Skip datasets whose output is up to date before prefetching anything,
+        # so cleaning up the download cache doesn't cause any re-downloads.
+        if is_up_to_date(*dataset_manifest(task)[1:]):
+            click.echo(f"Cache hit, {task['output']} is up to date")
+            continue
+        tasks.append(task)
+
+    if not tasks:
+        return
 
-    # Process each match
-    for match in matches:
-        # Clean up the JSON string - remove trailing comma if present
-        json_str = match.strip()
-        # Fix common JSON issues like trailing commas
-        json_str = re.sub(r",\s*}", "}", json_str)
-        json_str = re.sub(r",\s*]", "]", json_str)
+    # Datasets are independent, so process them in parallel on CPUs. Split the
+    # cores between the workers so their BLAS / OpenMP / numba pools don't
+    # oversubscribe the machine. The workers are spawned (not forked) so they
+    # pick these limits up from the environment before loading those libraries.
+    # With a GPU, every worker would load its own model and cuML/CUDA context on
+    # the same device, so run a single worker and let it use all the cores.
+    import torch
 
-        # Parse the JSON parameters
-        params = json.loads(json_str)
+    cpu_count = os.cpu_count() or 1
+    max_workers = 1 if torch.cuda.is_available() else min(len(tasks), cpu_count)
+    threads = str(max(1, cpu_count // max_workers))
+    for name in ["OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "NUMBA_NUM_THREADS"]:
+        os.environ.setdefault(name, threads)
 
-        # Call the generate_dataset_embedding function with **params
-        generate_dataset_embedding(**params, output_folder=output_folder)
+    # Downloads are prefetched into the download cache in the background, and
+    # each dataset is handed to a worker once its file is there, so fetching the
+    # next dataset overlaps with projecting the current one.
+    downloads = Path(output_folder) / ".downloads"
+    with (
+        ThreadPoolExecutor(max_workers=2) as downloader,
+        ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=setup_logging,
+        ) as executor,
+    ):
+        prefetches = [
+            downloader.submit(
+                load_and_check_integrity,
+                task["url"],
+                sha256=task["sha256"],
+                cache_dir=downloads,
+            )
+            for task in tasks
+        ]
+        futures = []
+        for task, prefetch in zip(tasks, prefetches):
+            prefetch.result()
+            futures.append(executor.submit(run_task, task))
+        for future in futures:
+            future.result()
 
 
 if __name__ == "__main__":